@@ -462,3 +462,7 @@ class FinMindClient:
     def get_error_log(self) -> list[dict]:
         """取得錯誤日誌"""
         return self._error_log.copy()
+
+    def clear_error_log(self):
+        """清除錯誤日誌（共用客戶端時，每次任務結束後呼叫）"""
+        self._error_log.clear()
@@ -5,6 +5,7 @@
 - 主要來源失敗時自動切換到備援來源
 - 資料不完整時觸發備援
 """
+import functools
 from datetime import date, datetime
 from typing import Optional
 
@@ -214,7 +215,12 @@ class HybridClient:
 
         # 有缺失，嘗試用備援來源補齊
         logger.info(f"[補齊] 發現 {len(missing_stocks)} 檔缺失，使用 yfinance 補齊...")
-        logger.debug(f"[補齊] 缺失股票: {sorted(missing_stocks)[:10]}{'...' if len(missing_stocks) > 10 else ''}")
+        # lazy: DEBUG 未啟用時不排序缺失清單
+        logger.opt(lazy=True).debug(
+            "[補齊] 缺失股票: {}{}",
+            lambda: sorted(missing_stocks)[:10],
+            lambda: "..." if len(missing_stocks) > 10 else "",
+        )
 
         try:
             # 只請求缺失的股票
@@ -356,3 +362,15 @@ class HybridClient:
     def get_fallback_log(self) -> list[dict]:
         """取得備援事件日誌"""
         return self._fallback_log.copy()
+
+    def clear_logs(self):
+        """清除錯誤與備援日誌（共用客戶端時避免下次任務重複回報）"""
+        self._finmind.clear_error_log()
+        self._yfinance.clear_error_log()
+        self._fallback_log.clear()
+
+
+@functools.lru_cache(maxsize=1)
+def get_client() -> HybridClient:
+    """取得共用的 HybridClient（排程模式下各任務重用同一組 API session）"""
+    return HybridClient()
@@ -246,6 +246,7 @@ class USStockClientFree(USStockClientBase):
 
         # 合併所有資料
         result_df = pd.concat(all_data, ignore_index=True)
+        all_data.clear()  # 釋放各批次 DataFrame
 
         # 標準化日期格式
         result_df["date"] = pd.to_datetime(result_df["date"]).dt.date
@@ -426,6 +426,7 @@ class YFinanceClient:
             return pd.DataFrame()
 
         result_df = pd.concat(all_data, ignore_index=True)
+        all_data.clear()  # 釋放各批次 DataFrame
         result_df["date"] = pd.to_datetime(result_df["date"]).dt.date
 
         logger.info(f"取得 {len(result_df)} 筆股價資料")
@@ -605,3 +606,7 @@ class YFinanceClient:
     def get_error_log(self) -> list[dict]:
         """取得錯誤日誌"""
         return self._error_log.copy()
+
+    def clear_error_log(self):
+        """清除錯誤日誌（共用客戶端時，每次任務結束後呼叫）"""
+        self._error_log.clear()
@@ -280,6 +280,65 @@ class MovingAverageCalculator:
         logger.info("三線開花計算資料準備完成")
         return df
 
+    @classmethod
+    def prepare_all_data(
+        cls,
+        df: pd.DataFrame
+    ) -> pd.DataFrame:
+        """
+        一次準備 VCP 與三線開花所需的所有計算欄位
+
+        只排序、分組一次，各滾動視窗以 groupby().rolling() 計算，
+        不再像 prepare_vcp_data + prepare_sanxian_data 逐步複製整表。
+        欄位與數值和兩者分別計算的結果相同。
+
+        Args:
+            df: 原始股價 DataFrame
+
+        Returns:
+            包含 VCP 與三線開花所需欄位的 DataFrame
+        """
+        if df.empty:
+            return df
+
+        logger.info("準備 VCP / 三線開花計算資料...")
+
+        df = df.sort_values(["stock_id", "date"], ignore_index=True)
+        grouped = df.groupby("stock_id", sort=False)
+
+        def rolling(column: str, window: int, min_periods: int):
+            # groupby().rolling() 以 (stock_id, 原索引) 為索引，去掉外層後對齊原表
+            return grouped[column].rolling(window=window, min_periods=min_periods)
+
+        def aligned(result: pd.Series) -> pd.Series:
+            return result.reset_index(level=0, drop=True)
+
+        # 均線（VCP: 50/150/200，三線開花: 8/21/55）
+        for period in [8, 21, 50, 55, 150, 200]:
+            df[f"ma{period}"] = aligned(rolling("close_price", period, period).mean())
+
+        # MA200 斜率（20日前比較）
+        df["ma200_slope_20d"] = df["ma200"] - df.groupby("stock_id", sort=False)["ma200"].shift(20)
+
+        # 20 日報酬率
+        df["return_20d"] = grouped["close_price"].transform(
+            lambda x: x.pct_change(periods=20)
+        )
+
+        # 5 日高點和 52 週高點（最高/最低價，有多少資料就算多少）
+        for period in [5, 252]:
+            df[f"high_{period}d"] = aligned(rolling("high_price", period, 1).max())
+            df[f"low_{period}d"] = aligned(rolling("low_price", period, 1).min())
+
+        # 55 日收盤價高點（至少需要一半天數）
+        df["high_55d"] = aligned(rolling("close_price", 55, 55 // 2).max())
+
+        # 55 日次高價
+        df = cls.calculate_second_high(df, period=55)
+
+        logger.info("VCP / 三線開花計算資料準備完成")
+        return df
+
     @staticmethod
     def calculate_close_high(
         df: pd.DataFrame,
@@ -46,7 +46,8 @@ class SanxianFilter:
     def filter(
         self,
         price_df: pd.DataFrame,
-        target_date: Optional[date] = None
+        target_date: Optional[date] = None,
+        prepared: bool = False
     ) -> pd.DataFrame:
         """
         執行三線開花篩選
@@ -54,6 +55,7 @@ class SanxianFilter:
         Args:
             price_df: 股價 DataFrame（需包含計算所需欄位）
             target_date: 目標日期（預設為最新日期）
+            prepared: price_df 已含計算欄位（如 prepare_all_data 結果）時略過重複計算
 
         Returns:
             篩選結果 DataFrame，包含:
@@ -67,20 +69,21 @@ class SanxianFilter:
             return pd.DataFrame()
 
         # 準備計算資料
-        df = MovingAverageCalculator.prepare_sanxian_data(price_df)
+        df = price_df if prepared else MovingAverageCalculator.prepare_sanxian_data(price_df)
 
         if df.empty:
             logger.warning("計算資料為空")
             return pd.DataFrame()
 
-        # 取得目標日期的資料（統一日期格式避免比較問題）
-        df["date"] = pd.to_datetime(df["date"]).dt.date
+        # 取得目標日期的資料（以 datetime64 比對，只轉換選出列的日期）
+        dates = pd.to_datetime(df["date"])
         if target_date:
-            df = df[df["date"] == target_date]
+            mask = dates == pd.Timestamp(target_date)
         else:
-            latest_date = df["date"].max()
-            df = df[df["date"] == latest_date]
-            logger.info(f"使用最新日期: {latest_date}")
+            latest_date = dates.max()
+            mask = dates == latest_date
+            logger.info(f"使用最新日期: {latest_date.date()}")
+        df = df.loc[mask].assign(date=dates[mask].dt.date)
 
         if df.empty:
             logger.warning("目標日期無資料")
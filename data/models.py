@@ -16,6 +16,7 @@ from sqlalchemy import (
     Boolean,
     Date,
     DateTime,
+    Float,
     Numeric,
     Index,
     UniqueConstraint,
@@ -87,7 +88,7 @@ class DailyPrice(Base):
         String(10), nullable=False, index=True, comment="股票代號"
     )
     date: Mapped[date_type] = mapped_column(
-        Date, nullable=False, index=True, comment="交易日期"
+        Date, nullable=False, comment="交易日期"
     )
     open_price: Mapped[Optional[Decimal]] = mapped_column(
         Numeric(12, 4), nullable=True, comment="開盤價"
@@ -111,7 +112,8 @@ class DailyPrice(Base):
     __table_args__ = (
         UniqueConstraint("stock_id", "date", name="uq_daily_price_stock_date"),
         Index("idx_daily_price_stock_date", "stock_id", "date"),
-        Index("idx_daily_price_date", "date"),
+        # 日期區間查詢（含 stock_id，可直接於索引內套用股票過濾）
+        Index("idx_daily_price_date_stock", "date", "stock_id"),
     )
 
     def __repr__(self):
@@ -171,8 +173,8 @@ class FilterResult(Base):
     )
 
     # VCP 專用欄位
-    return_20d: Mapped[Optional[Decimal]] = mapped_column(
-        Numeric(8, 4), nullable=True, comment="近20日股價漲幅"
+    return_20d: Mapped[Optional[float]] = mapped_column(
+        Float, nullable=True, comment="近20日股價漲幅"
     )
     is_strong_list: Mapped[Optional[bool]] = mapped_column(
         Boolean, nullable=True, comment="強勢清單"
@@ -182,14 +184,14 @@ class FilterResult(Base):
     )
 
     # 三線開花專用欄位
-    today_price: Mapped[Optional[Decimal]] = mapped_column(
-        Numeric(12, 4), nullable=True, comment="今日股價"
+    today_price: Mapped[Optional[float]] = mapped_column(
+        Float, nullable=True, comment="今日股價"
     )
-    second_high_55d: Mapped[Optional[Decimal]] = mapped_column(
-        Numeric(12, 4), nullable=True, comment="55日內次高價"
+    second_high_55d: Mapped[Optional[float]] = mapped_column(
+        Float, nullable=True, comment="55日內次高價"
     )
-    gap_ratio: Mapped[Optional[Decimal]] = mapped_column(
-        Numeric(8, 4), nullable=True, comment="差距比例"
+    gap_ratio: Mapped[Optional[float]] = mapped_column(
+        Float, nullable=True, comment="差距比例"
     )
 
     created_at: Mapped[datetime] = mapped_column(
@@ -202,3 +204,28 @@ class FilterResult(Base):
 
     def __repr__(self):
         return f"<FilterResult({self.filter_type}, {self.filter_date}, {self.stock_id})>"
+
+
+class ExportMeta(Base):
+    """
+    匯出紀錄表
+
+    儲存各分頁最後一次匯出內容的雜湊值，內容未變時略過重複上傳
+    """
+    __tablename__ = "export_meta"
+
+    sheet_id: Mapped[str] = mapped_column(
+        String(100), primary_key=True, comment="Spreadsheet ID"
+    )
+    tab: Mapped[str] = mapped_column(
+        String(50), primary_key=True, comment="分頁名稱"
+    )
+    hash: Mapped[str] = mapped_column(
+        String(64), nullable=False, comment="匯出內容雜湊值"
+    )
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime, server_default=func.now(), onupdate=func.now(), comment="更新時間"
+    )
+
+    def __repr__(self):
+        return f"<ExportMeta({self.sheet_id}, {self.tab}, {self.hash})>"
@@ -2,17 +2,28 @@
 SQLite 資料庫連線與操作
 適用於 GitHub Actions 環境
 """
+import functools
 from contextlib import contextmanager
 from datetime import date
 from pathlib import Path
-from typing import Generator, Optional
+from typing import Generator, Optional, Union
 
 import pandas as pd
 from loguru import logger
-from sqlalchemy import create_engine, text, event
+from sqlalchemy import (
+    Connection,
+    create_engine,
+    delete,
+    event,
+    func,
+    insert,
+    select,
+    text,
+)
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.orm import Session, sessionmaker
 
-from data.models import Base, StockInfo, DailyPrice, MarketIndex, FilterResult
+from data.models import Base, StockInfo, DailyPrice, MarketIndex, FilterResult, ExportMeta
 
 
 class SQLiteDatabase:
@@ -25,6 +36,19 @@ class SQLiteDatabase:
     - 支援所有基本 CRUD 操作
     """
 
+    # 篩選結果欄位 -> FilterResult 欄位
+    FILTER_RESULT_COLUMNS = {
+        "stock_id": "stock_id",
+        "stock_name": "stock_name",
+        "industry_category": "industry_category",
+        "return_20d": "return_20d",
+        "is_strong": "is_strong_list",
+        "is_new_high": "is_new_high_list",
+        "today_price": "today_price",
+        "second_high_55d": "second_high_55d",
+        "gap_ratio": "gap_ratio",
+    }
+
     def __init__(self, db_path: Optional[str] = None):
         """
         初始化資料庫連線
@@ -54,9 +78,13 @@ class SQLiteDatabase:
         @event.listens_for(self.engine, "connect")
         def set_sqlite_pragma(dbapi_conn, connection_record):
             cursor = dbapi_conn.cursor()
+            # 僅對尚未建表的新資料庫生效，既有資料庫需經 vacuum() 才會套用
+            cursor.execute("PRAGMA auto_vacuum=INCREMENTAL")
             cursor.execute("PRAGMA journal_mode=WAL")
             cursor.execute("PRAGMA synchronous=NORMAL")
             cursor.execute("PRAGMA cache_size=-64000")  # 64MB cache
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA mmap_size=268435456")  # 256MB mmap 讀取
             cursor.close()
 
         self.SessionLocal = sessionmaker(
@@ -65,17 +93,76 @@ class SQLiteDatabase:
             autoflush=False,
         )
 
+        # 預先建立寫入語句，重複使用同一物件以命中 SQLAlchemy 編譯快取
+        stock_insert = sqlite_insert(StockInfo)
+        self._stock_info_upsert = stock_insert.on_conflict_do_update(
+            index_elements=[StockInfo.stock_id],
+            set_={
+                "stock_name": stock_insert.excluded.stock_name,
+                "industry_category": stock_insert.excluded.industry_category,
+                "industry_category2": stock_insert.excluded.industry_category2,
+                "stock_type": stock_insert.excluded.stock_type,
+                "updated_at": func.now(),
+            },
+        )
+        self._market_index_insert = insert(MarketIndex)
+        export_insert = sqlite_insert(ExportMeta)
+        self._export_meta_upsert = export_insert.on_conflict_do_update(
+            index_elements=[ExportMeta.sheet_id, ExportMeta.tab],
+            set_={"hash": export_insert.excluded.hash, "updated_at": func.now()},
+        )
+
+        # 股價以 INSERT OR REPLACE 位置參數寫入，由 (stock_id, date) 唯一約束覆寫舊資料
+        self._daily_price_columns = [
+            "stock_id", "date", "open_price", "high_price",
+            "low_price", "close_price", "volume",
+        ]
+        self._daily_price_upsert = (
+            f"INSERT OR REPLACE INTO {DailyPrice.__tablename__} "
+            f"({', '.join(self._daily_price_columns)}) "
+            f"VALUES ({', '.join('?' * len(self._daily_price_columns))})"
+        )
+
+        # 篩選結果以位置參數寫入（欄位順序與 _filter_result_columns 一致）
+        self._filter_result_columns = [
+            "filter_date", "filter_type", *self.FILTER_RESULT_COLUMNS.values()
+        ]
+        self._filter_result_insert = (
+            f"INSERT INTO {FilterResult.__tablename__} "
+            f"({', '.join(self._filter_result_columns)}) "
+            f"VALUES ({', '.join('?' * len(self._filter_result_columns))})"
+        )
+
+        # 股票基本資料快取（(筆數, 最後更新時間), DataFrame），由 get_stock_info_df 維護
+        self._stock_info_cache: Optional[tuple[tuple, pd.DataFrame]] = None
+
         logger.info(f"SQLite 資料庫初始化完成: {db_path}")
 
     def create_tables(self):
         """建立所有資料表"""
         Base.metadata.create_all(self.engine)
         self._migrate_schema()
+        self._analyze()
         logger.info("資料表建立完成")
 
+    def _analyze(self):
+        """更新查詢規劃器統計資料，確保選用正確索引"""
+        with self.engine.connect() as conn:
+            # 限制每個索引的取樣列數，大表也能快速完成
+            conn.execute(text("PRAGMA analysis_limit=1000"))
+            conn.execute(text("ANALYZE"))
+            conn.commit()
+
     def _migrate_schema(self):
-        """Schema 遷移：添加新欄位（如果不存在）"""
+        """Schema 遷移：添加新欄位與索引（如果不存在）"""
         with self.engine.connect() as conn:
+            # 既有資料表不會由 create_all 補建索引；單欄日期索引由 (date, stock_id) 取代
+            for index in DailyPrice.__table__.indexes:
+                index.create(conn, checkfirst=True)
+            for name in ("idx_daily_price_date", "ix_daily_price_date"):
+                conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+            conn.commit()
+
             # 檢查 stock_info 表是否有 industry_category2 欄位
             result = conn.execute(text("PRAGMA table_info(stock_info)"))
             columns = [row[1] for row in result.fetchall()]
@@ -106,6 +193,24 @@ class SQLiteDatabase:
         finally:
             session.close()
 
+    @contextmanager
+    def _bulk_mode(self) -> Generator[Connection, None, None]:
+        """
+        批次寫入模式（Context Manager）
+
+        - 以 BEGIN IMMEDIATE 開始交易，一開始就取得寫入鎖，避免讀鎖升級
+        - 直接使用 Core Connection，略過 ORM Session 的狀態管理
+        """
+        with self.engine.connect() as conn:
+            conn.exec_driver_sql("BEGIN IMMEDIATE")
+            try:
+                yield conn
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                logger.error(f"批次寫入失敗: {e}")
+                raise
+
     # ==================== StockInfo 操作 ====================
 
     def upsert_stock_info(self, df: pd.DataFrame) -> int:
@@ -126,28 +231,11 @@ class SQLiteDatabase:
         df = df[[c for c in required_cols if c in df.columns]].copy()
         df = df.rename(columns={"type": "stock_type"})
 
-        count = 0
-        with self.get_session() as session:
-            for _, row in df.iterrows():
-                # SQLite 使用 INSERT OR REPLACE
-                existing = session.query(StockInfo).filter(
-                    StockInfo.stock_id == row["stock_id"]
-                ).first()
-
-                if existing:
-                    existing.stock_name = row["stock_name"]
-                    existing.industry_category = row.get("industry_category")
-                    existing.industry_category2 = row.get("industry_category2")
-                    existing.stock_type = row.get("stock_type")
-                else:
-                    session.add(StockInfo(
-                        stock_id=row["stock_id"],
-                        stock_name=row["stock_name"],
-                        industry_category=row.get("industry_category"),
-                        industry_category2=row.get("industry_category2"),
-                        stock_type=row.get("stock_type"),
-                    ))
-                count += 1
+        records = df.astype(object).where(df.notna(), None).to_dict("records")
+        with self._bulk_mode() as conn:
+            conn.execute(self._stock_info_upsert, records)
+        count = len(records)
+        self._stock_info_cache = None
 
         logger.info(f"寫入/更新 {count} 筆股票基本資料")
         return count
@@ -159,30 +247,46 @@ class SQLiteDatabase:
             df = pd.read_sql(query.statement, session.bind)
         return df
 
+    def get_stock_info_df(self) -> pd.DataFrame:
+        """
+        取得股票資訊 DataFrame（stock_id, stock_name, industry_category,
+        industry_category2, stock_type），直接由 SQL 組成
+
+        結果依 (筆數, 最後更新時間) 快取，資料表未變時不重新讀取；
+        回傳的 DataFrame 為共用物件，呼叫端請勿修改。
+        """
+        with self.engine.connect() as conn:
+            version = tuple(conn.execute(
+                select(func.count(), func.max(StockInfo.updated_at))
+            ).one())
+            if self._stock_info_cache and self._stock_info_cache[0] == version:
+                return self._stock_info_cache[1]
+
+            df = pd.read_sql(
+                select(
+                    StockInfo.stock_id,
+                    StockInfo.stock_name,
+                    StockInfo.industry_category,
+                    StockInfo.industry_category2,
+                    StockInfo.stock_type,
+                ),
+                conn,
+            )
+
+        self._stock_info_cache = (version, df)
+        return df
+
     def get_stock_info_dict(self) -> dict[str, dict]:
         """取得股票資訊字典 (stock_id -> info)"""
-        df = self.get_all_stock_info()
+        df = self.get_stock_info_df()
         if df.empty:
             return {}
-        return {
-            row["stock_id"]: {
-                "stock_name": row["stock_name"],
-                "industry_category": row.get("industry_category", "-"),
-                "industry_category2": row.get("industry_category2", "-"),
-                "stock_type": row.get("stock_type", "twse"),
-            }
-            for _, row in df.iterrows()
-        }
+        return df.set_index("stock_id").to_dict("index")
 
     def get_stock_market_types(self) -> dict[str, str]:
         """取得所有股票的市場類型 {stock_id: market_type}"""
-        df = self.get_all_stock_info()
-        if df.empty:
-            return {}
-        return {
-            row["stock_id"]: row.get("stock_type", "twse")
-            for _, row in df.iterrows()
-        }
+        df = self.get_stock_info_df()
+        return dict(zip(df["stock_id"], df["stock_type"]))
 
     # ==================== DailyPrice 操作 ====================
 
@@ -208,34 +312,26 @@ class SQLiteDatabase:
         }
         df = df.rename(columns=column_mapping)
 
-        # 只保留需要的欄位
-        columns = ["stock_id", "date", "open_price", "high_price",
-                   "low_price", "close_price", "volume"]
-        df = df[[c for c in columns if c in df.columns]].copy()
+        # 只保留需要的欄位（缺少的欄位寫入 NULL）
+        df = df.reindex(columns=self._daily_price_columns)
 
         # 去除重複
-        df = df.drop_duplicates(subset=["stock_id", "date"], keep="last")
+        df.drop_duplicates(subset=["stock_id", "date"], keep="last", inplace=True, ignore_index=True)
+        # 與 SQLAlchemy Date 欄位相同的 ISO 字串格式
+        df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
 
         total_count = len(df)
 
-        # 按日期分批處理，避免跨日期刪除資料
-        # 修正：原本的邏輯會刪除「所有日期 x 所有股票」的笛卡爾積
-        # 現在改為每個日期獨立處理，只刪除該日期中即將插入的股票
-        with self.get_session() as session:
-            for target_date in df["date"].unique():
-                # 取得該日期的資料
-                day_df = df[df["date"] == target_date]
-                day_stock_ids = day_df["stock_id"].unique().tolist()
-
-                # 只刪除該日期中即將插入的股票資料
-                session.query(DailyPrice).filter(
-                    DailyPrice.date == target_date,
-                    DailyPrice.stock_id.in_(day_stock_ids)
-                ).delete(synchronize_session=False)
+        # tuple 列表以位置參數綁定，單一 executemany 重複使用同一個預備語句
+        records = (
+            df.astype(object)
+            .where(df.notna(), None)
+            .to_records(index=False)
+            .tolist()
+        )
 
-                # 插入該日期的資料
-                records = day_df.to_dict("records")
-                session.bulk_insert_mappings(DailyPrice, records)
+        with self._bulk_mode() as conn:
+            conn.exec_driver_sql(self._daily_price_upsert, records)
 
         logger.info(f"寫入/更新 {total_count} 筆股價資料")
         return total_count
@@ -244,7 +340,8 @@ class SQLiteDatabase:
         self,
         start_date: date,
         end_date: date,
-        stock_ids: Optional[list[str]] = None
+        stock_ids: Optional[list[str]] = None,
+        listed_only: bool = False
     ) -> pd.DataFrame:
         """
         取得指定期間的股價資料
@@ -253,6 +350,7 @@ class SQLiteDatabase:
             start_date: 開始日期
             end_date: 結束日期
             stock_ids: 指定股票代號列表（可選）
+            listed_only: 只取 stock_info 中的股票（排除 ETF、權證等，於 SQL 端過濾）
 
         Returns:
             股價 DataFrame
@@ -266,6 +364,9 @@ class SQLiteDatabase:
             if stock_ids:
                 query = query.filter(DailyPrice.stock_id.in_(stock_ids))
 
+            if listed_only:
+                query = query.filter(DailyPrice.stock_id.in_(select(StockInfo.stock_id)))
+
             query = query.order_by(DailyPrice.stock_id, DailyPrice.date)
             df = pd.read_sql(query.statement, session.bind)
 
@@ -273,12 +374,11 @@ class SQLiteDatabase:
 
     def get_latest_date(self) -> Optional[date]:
         """取得資料庫中最新的股價日期"""
+        # MAX(date) 可直接由 idx_daily_price_date_stock 索引尾端取得，無需排序
         with self.get_session() as session:
-            result = session.query(DailyPrice.date).order_by(
-                DailyPrice.date.desc()
-            ).first()
-
-        return result[0] if result else None
+            return session.execute(
+                select(func.max(DailyPrice.date))
+            ).scalar()
 
     # ==================== MarketIndex 操作 ====================
 
@@ -296,18 +396,16 @@ class SQLiteDatabase:
             return 0
 
         df = df[["date", "taiex"]].copy()
-        df = df.drop_duplicates(subset=["date"], keep="last")
+        df.drop_duplicates(subset=["date"], keep="last", inplace=True, ignore_index=True)
 
-        with self.get_session() as session:
+        with self._bulk_mode() as conn:
             # 先刪除已存在的日期
             dates = df["date"].unique().tolist()
-            session.query(MarketIndex).filter(
-                MarketIndex.date.in_(dates)
-            ).delete(synchronize_session=False)
+            conn.execute(delete(MarketIndex).where(MarketIndex.date.in_(dates)))
 
             # 插入新資料
             records = df.to_dict("records")
-            session.bulk_insert_mappings(MarketIndex, records)
+            conn.execute(self._market_index_insert, records)
 
         logger.info(f"寫入/更新 {len(records)} 筆大盤指數")
         return len(records)
@@ -332,7 +430,7 @@ class SQLiteDatabase:
 
     def save_filter_results(
         self,
-        results: list[dict],
+        results: Union[list[dict], pd.DataFrame],
         filter_type: str,
         filter_date: date
     ) -> int:
@@ -340,44 +438,84 @@ class SQLiteDatabase:
         儲存篩選結果
 
         Args:
-            results: 篩選結果列表
+            results: 篩選結果（list[dict] 或 DataFrame）
             filter_type: 篩選類型 (vcp/sanxian)
             filter_date: 篩選日期
 
         Returns:
             儲存的筆數
         """
-        if not results:
-            return 0
+        return self.save_filter_results_many({filter_type: results}, filter_date)[filter_type]
 
-        with self.get_session() as session:
-            # 先刪除當天同類型的舊結果
-            session.query(FilterResult).filter(
-                FilterResult.filter_date == filter_date,
-                FilterResult.filter_type == filter_type
-            ).delete()
-
-            # 批次寫入新結果
-            records = [
-                {
-                    "filter_date": filter_date,
-                    "filter_type": filter_type,
-                    "stock_id": r["stock_id"],
-                    "stock_name": r.get("stock_name", ""),
-                    "industry_category": r.get("industry_category"),
-                    "return_20d": r.get("return_20d"),
-                    "is_strong_list": r.get("is_strong"),
-                    "is_new_high_list": r.get("is_new_high"),
-                    "today_price": r.get("today_price"),
-                    "second_high_55d": r.get("second_high_55d"),
-                    "gap_ratio": r.get("gap_ratio"),
-                }
-                for r in results
-            ]
-            session.bulk_insert_mappings(FilterResult, records)
-
-        logger.info(f"儲存 {len(results)} 筆 {filter_type} 篩選結果")
-        return len(results)
+    def save_filter_results_many(
+        self,
+        results_by_type: dict[str, Union[list[dict], pd.DataFrame]],
+        filter_date: date
+    ) -> dict[str, int]:
+        """
+        一次儲存多種篩選結果（單一交易）
+
+        Args:
+            results_by_type: {篩選類型: 篩選結果}
+            filter_date: 篩選日期
+
+        Returns:
+            {篩選類型: 儲存的筆數}（結果為空的類型不覆寫舊資料，筆數為 0）
+        """
+        counts = {filter_type: 0 for filter_type in results_by_type}
+        batches = {}
+        for filter_type, results in results_by_type.items():
+            records = self._filter_result_records(results, filter_type, filter_date)
+            if records:
+                batches[filter_type] = records
+        if not batches:
+            return counts
+
+        with self._bulk_mode() as conn:
+            for filter_type, records in batches.items():
+                # 先刪除當天同類型的舊結果
+                conn.execute(delete(FilterResult).where(
+                    FilterResult.filter_date == filter_date,
+                    FilterResult.filter_type == filter_type
+                ))
+
+                # 批次寫入新結果
+                conn.exec_driver_sql(self._filter_result_insert, records)
+                counts[filter_type] = len(records)
+
+        for filter_type, records in batches.items():
+            logger.info(f"儲存 {len(records)} 筆 {filter_type} 篩選結果")
+        return counts
+
+    def _filter_result_records(
+        self,
+        results: Union[list[dict], pd.DataFrame],
+        filter_type: str,
+        filter_date: date
+    ) -> list[tuple]:
+        """篩選結果轉為 INSERT 位置參數列表"""
+        if isinstance(results, pd.DataFrame):
+            df = results
+        else:
+            df = pd.DataFrame.from_records(results) if results else pd.DataFrame()
+
+        if df.empty:
+            return []
+
+        # 整欄投影成 FilterResult 欄位，避免逐列逐欄 r.get()
+        df = df.reindex(columns=list(self.FILTER_RESULT_COLUMNS))
+        df = df.rename(columns=self.FILTER_RESULT_COLUMNS)
+        df["stock_name"] = df["stock_name"].fillna("")
+        df.insert(0, "filter_date", filter_date.isoformat())
+        df.insert(1, "filter_type", filter_type)
+
+        # record array -> tuple 列表，以位置參數綁定，免去逐列建立 dict
+        return (
+            df.astype(object)
+            .where(df.notna(), None)
+            .to_records(index=False)
+            .tolist()
+        )
 
     def get_filter_results(
         self,
@@ -394,6 +532,27 @@ class SQLiteDatabase:
 
         return df
 
+    # ==================== ExportMeta 操作 ====================
+
+    def get_export_hash(self, sheet_id: str, tab: str) -> Optional[str]:
+        """取得分頁最後一次匯出內容的雜湊值"""
+        with self.engine.connect() as conn:
+            return conn.execute(
+                select(ExportMeta.hash).where(
+                    ExportMeta.sheet_id == sheet_id,
+                    ExportMeta.tab == tab,
+                )
+            ).scalar()
+
+    def set_export_hash(self, sheet_id: str, tab: str, digest: str) -> None:
+        """記錄分頁匯出內容的雜湊值"""
+        with self.engine.connect() as conn:
+            conn.execute(
+                self._export_meta_upsert,
+                {"sheet_id": sheet_id, "tab": tab, "hash": digest},
+            )
+            conn.commit()
+
     # ==================== 工具方法 ====================
 
     def execute_sql(self, sql: str) -> None:
@@ -425,7 +584,56 @@ class SQLiteDatabase:
         return "0 B"
 
     def vacuum(self):
-        """壓縮資料庫檔案"""
+        """
+        壓縮資料庫檔案
+
+        - auto_vacuum=INCREMENTAL 的資料庫只需回收空閒頁
+        - 其餘以 VACUUM 就地重建，同時套用連線時設定的 auto_vacuum=INCREMENTAL
+          （SQLite 自行持有排他鎖並維護 WAL，不替換檔案，其他行程的連線不受影響）
+        """
+        with self.engine.connect() as conn:
+            auto_vacuum = conn.execute(text("PRAGMA auto_vacuum")).scalar()
+            free_pages = conn.execute(text("PRAGMA freelist_count")).scalar()
+
+        # 先判斷模式：舊資料庫即使沒有空閒頁也要 VACUUM 一次，才會轉為 INCREMENTAL
+        if auto_vacuum != 2:  # 非 INCREMENTAL
+            with self.engine.connect() as conn:
+                conn.exec_driver_sql("VACUUM")
+            logger.info("資料庫已壓縮")
+            return
+
+        if not free_pages:
+            logger.info("資料庫無可回收空間，略過壓縮")
+            return
+
+        self.incremental_vacuum()
+
+    def incremental_vacuum(self, pages: int = 0) -> int:
+        """
+        回收空閒頁（需 auto_vacuum=INCREMENTAL）
+
+        PRAGMA incremental_vacuum 每回收一頁執行一步，需執行到結束才會全部回收；
+        以 DBAPI executescript 執行（sqlite3 的 execute 只會執行一步，只回收一頁）
+
+        Args:
+            pages: 最多回收的頁數（0 表示全部）
+
+        Returns:
+            回收後剩餘的空閒頁數
+        """
         with self.engine.connect() as conn:
-            conn.execute(text("VACUUM"))
-        logger.info("資料庫已壓縮")
+            conn.connection.driver_connection.executescript(
+                f"PRAGMA incremental_vacuum({int(pages)});"
+            )
+            remaining = conn.execute(text("PRAGMA freelist_count")).scalar()
+
+        if not pages and remaining:
+            logger.warning(f"資料庫空閒頁未完全回收，仍剩 {remaining} 頁")
+        else:
+            logger.info("資料庫空閒頁已回收")
+        return remaining
+
+@functools.lru_cache(maxsize=1)
+def get_db() -> SQLiteDatabase:
+    """取得共用的 SQLiteDatabase（排程模式下各任務重用同一 engine 與連線池）"""
+    return SQLiteDatabase()
@@ -55,6 +55,8 @@ class USSQLiteDatabase:
             cursor.execute("PRAGMA journal_mode=WAL")
             cursor.execute("PRAGMA synchronous=NORMAL")
             cursor.execute("PRAGMA cache_size=-64000")  # 64MB cache
+            cursor.execute("PRAGMA temp_store=MEMORY")
+            cursor.execute("PRAGMA mmap_size=268435456")  # 256MB mmap 讀取
             cursor.close()
 
         self.SessionLocal = sessionmaker(
@@ -247,7 +249,7 @@ class USSQLiteDatabase:
         df = df[[c for c in columns if c in df.columns]].copy()
 
         # 去除重複
-        df = df.drop_duplicates(subset=["stock_id", "date"], keep="last")
+        df.drop_duplicates(subset=["stock_id", "date"], keep="last", inplace=True, ignore_index=True)
 
         total_count = len(df)
 
@@ -349,7 +351,7 @@ class USSQLiteDatabase:
 
         cols_to_use = [c for c in required_cols + optional_cols if c in df.columns]
         df = df[cols_to_use].copy()
-        df = df.drop_duplicates(subset=["date"], keep="last")
+        df.drop_duplicates(subset=["date"], keep="last", inplace=True, ignore_index=True)
 
         with self.get_session() as session:
             dates = df["date"].unique().tolist()
@@ -1,21 +1,111 @@
 """
 Google Sheet 匯出模組
 """
+import functools
+import hashlib
+import json
+import re
+import threading
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from datetime import date, datetime
-from typing import Optional
+from typing import Callable, Generator, Optional, TypeVar, Union
 
 import gspread
 import numpy as np
 import pandas as pd
 from google.oauth2.service_account import Credentials
+from gspread.utils import absolute_range_name, rowcol_to_a1
 from loguru import logger
+from requests.adapters import HTTPAdapter
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
+from urllib3.util.retry import Retry
 
 from config.settings import GOOGLE_CREDENTIALS_PATH, SHEET_IDS
 
-# Google API 重試設定
-GSHEET_MAX_RETRIES = 3
-GSHEET_RETRY_DELAY = 5  # 秒
+# Google API 重試設定（指數退避 + jitter）
+GSHEET_MAX_ATTEMPTS = 5
+GSHEET_RETRY_INITIAL = 2  # 秒
+GSHEET_RETRY_MAX = 60  # 秒
+GSHEET_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# 傳輸層重試（僅連線失敗；HTTP 狀態碼重試交由 _execute_with_retry，避免重試次數相乘）
+GSHEET_CONNECT_RETRIES = 3
+GSHEET_CONNECT_BACKOFF = 1.5  # 秒
+
+# 並行匯出上限（VCP / 三線開花 / 驗證分屬不同 Spreadsheet，配額互不影響）
+GSHEET_EXPORT_WORKERS = 3
+
+# 單次 batchUpdate 最多請求數（超過時分批送出）
+GSHEET_BATCH_MAX_REQUESTS = 50
+
+# Spreadsheet 物件快取有效秒數（避免重複 open_by_key）
+SHEET_CACHE_TTL = 300
+# 快取失效的錯誤狀態碼（憑證失效 / 無權限 / 不存在；429、5XX 為暫時性錯誤不失效）
+SHEET_CACHE_INVALIDATE_STATUS = {401, 403, 404}
+
+# 更新紀錄時間格式
+LOG_TIME_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# 日期頁籤名稱格式 (YYMMDD)
+_DATE_TAB_RE = re.compile(r"^\d{6}$")
+
+# 各分頁資料欄位（dict key，依輸出欄位順序）
+_COMPANY_COLS = [
+    "stock_id", "stock_name", "company_name",
+    "industry_category", "industry_category2", "product_mix",
+]
+_VCP_COLS = _COMPANY_COLS + ["return_20d", "is_strong", "is_new_high"]
+_SANXIAN_COLS = _COMPANY_COLS + ["today_price", "second_high_55d", "gap_ratio"]
+_VERIFY_VCP_COLS = [
+    "stock_id", "date", "close_price", "high_price",
+    "ma50", "ma150", "ma200", "ma200_slope_20d",
+    "return_20d", "high_5d", "high_252d", "gap_to_52w_high",
+    "cond1", "cond2", "cond3", "cond4", "cond5",
+    "is_strong", "is_new_high", "is_vcp",
+]
+_VERIFY_SANXIAN_COLS = [
+    "stock_id", "date", "close_price",
+    "ma8", "ma21", "ma55",
+    "high_55d", "second_high_55d", "gap_ratio",
+    "cond1", "cond2", "cond3", "cond4", "is_sanxian",
+]
+
+T = TypeVar("T")
+
+
+def _is_retryable(e: BaseException) -> bool:
+    """判斷是否為可重試的 Google API 錯誤（429 / 5XX）"""
+    return (
+        isinstance(e, gspread.exceptions.APIError)
+        and getattr(e.response, "status_code", None) in GSHEET_RETRYABLE_STATUS
+    )
+
+
+def _log_retry(retry_state) -> None:
+    """重試前記錄警告"""
+    logger.warning(
+        f"Google API 暫時不可用，{retry_state.next_action.sleep:.1f} 秒後重試 "
+        f"({retry_state.attempt_number}/{GSHEET_MAX_ATTEMPTS - 1})..."
+    )
+
+
+@retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_exponential_jitter(initial=GSHEET_RETRY_INITIAL, max=GSHEET_RETRY_MAX),
+    stop=stop_after_attempt(GSHEET_MAX_ATTEMPTS),
+    before_sleep=_log_retry,
+    reraise=True,
+)
+def _execute_with_retry(fn: Callable[[], T]) -> T:
+    """執行 Google API 呼叫（429 / 5XX 自動重試）"""
+    return fn()
 
 
 class GoogleSheetExporter:
@@ -33,26 +123,57 @@ class GoogleSheetExporter:
         "https://www.googleapis.com/auth/drive",
     ]
 
-    def __init__(self, credentials_path: Optional[str] = None):
+    # 已解析的憑證內容（path -> service account info），重建匯出器時免重讀檔案
+    _creds_cache: dict[str, dict] = {}
+    # 已建立的憑證物件（path -> Credentials），共用 access token 免重新簽署 JWT
+    _credentials_cache: dict[str, Credentials] = {}
+
+    def __init__(self, credentials_path: Optional[str] = None, db=None):
         """
         初始化匯出器
 
         Args:
             credentials_path: Service Account 憑證路徑
+            db: SQLiteDatabase 實例（可選，用於記錄匯出雜湊、略過內容未變的重複上傳）
         """
         self.credentials_path = credentials_path or GOOGLE_CREDENTIALS_PATH
+        self.db = db
         self.client: Optional[gspread.Client] = None
+        self._sheet_cache: dict[str, tuple[float, gspread.Spreadsheet]] = {}
+        self._ws_cache: dict[tuple[str, str], gspread.Worksheet] = {}
+        self._sheet_cache_lock = threading.Lock()  # export_all 並行匯出時保護快取
+        # 新分頁 sheetId 由本地依現有頁籤推算，並行建立/刪除分頁須逐一進行以免重複
+        self._tab_lock = threading.Lock()
+        # 延後寫入（執行緒區域變數 pending: spreadsheet id -> (Spreadsheet, ValueRange 列表)），
+        # 由 batch_writes 啟用、flush() 合併送出；共用實例並行匯出時各執行緒互不干擾
+        self._local = threading.local()
 
         self._connect()
 
+    @classmethod
+    def _load_creds_info(cls, path: str) -> dict:
+        """讀取並快取憑證 JSON"""
+        if path not in cls._creds_cache:
+            with open(path, "rb") as f:
+                cls._creds_cache[path] = json.load(f)
+        return cls._creds_cache[path]
+
+    @classmethod
+    def _load_credentials(cls, path: str) -> Credentials:
+        """取得並快取 Service Account 憑證物件"""
+        if path not in cls._credentials_cache:
+            cls._credentials_cache[path] = Credentials.from_service_account_info(
+                cls._load_creds_info(path),
+                scopes=cls.SCOPES
+            )
+        return cls._credentials_cache[path]
+
     def _connect(self):
         """建立 Google Sheets 連線"""
         try:
-            creds = Credentials.from_service_account_file(
-                self.credentials_path,
-                scopes=self.SCOPES
-            )
+            creds = self._load_credentials(self.credentials_path)
             self.client = gspread.authorize(creds)
+            self._mount_transport()
             logger.info("Google Sheets 連線成功")
         except FileNotFoundError:
             logger.warning(
@@ -64,36 +185,449 @@ class GoogleSheetExporter:
             logger.error(f"Google Sheets 連線失敗: {e}")
             self.client = None
 
+    def _mount_transport(self):
+        """
+        為 gspread 的 HTTP session 掛載連線池與傳輸層重試
+
+        所有呼叫共用同一 session（keep-alive、TLS 重用），連線池大小配合並行匯出數。
+        """
+        # gspread 6 將 session 移至 http_client；5.x 直接掛在 client 上
+        http_client = getattr(self.client, "http_client", self.client)
+        adapter = HTTPAdapter(
+            pool_connections=GSHEET_EXPORT_WORKERS,
+            pool_maxsize=GSHEET_EXPORT_WORKERS,
+            max_retries=Retry(
+                total=GSHEET_CONNECT_RETRIES,
+                connect=GSHEET_CONNECT_RETRIES,
+                read=0,
+                status=0,
+                backoff_factor=GSHEET_CONNECT_BACKOFF,
+            ),
+        )
+        http_client.session.mount("https://", adapter)
+
     def _get_sheet(self, sheet_id: str) -> Optional[gspread.Spreadsheet]:
-        """取得 Spreadsheet 物件（含 503 重試機制）"""
+        """取得 Spreadsheet 物件（含快取與 429/5XX 重試機制）"""
         if not self.client:
             logger.error("未連線到 Google Sheets")
             return None
 
-        for attempt in range(GSHEET_MAX_RETRIES + 1):
-            try:
-                return self.client.open_by_key(sheet_id)
-            except gspread.exceptions.APIError as e:
-                # 503 Service Unavailable 或其他可重試的錯誤
-                if "503" in str(e) or "429" in str(e) or "500" in str(e):
-                    if attempt < GSHEET_MAX_RETRIES:
-                        wait_time = GSHEET_RETRY_DELAY * (attempt + 1)
-                        logger.warning(
-                            f"Google API 暫時不可用，{wait_time} 秒後重試 "
-                            f"({attempt + 1}/{GSHEET_MAX_RETRIES})..."
-                        )
-                        time.sleep(wait_time)
-                        continue
-                logger.error(f"無法開啟 Sheet {sheet_id}: {e}")
-                return None
-            except Exception as e:
-                logger.error(f"無法開啟 Sheet {sheet_id}: {e}")
-                return None
-        return None
+        with self._sheet_cache_lock:
+            cached = self._sheet_cache.get(sheet_id)
+        if cached and time.monotonic() - cached[0] < SHEET_CACHE_TTL:
+            return cached[1]
+
+        try:
+            sheet = _execute_with_retry(lambda: self.client.open_by_key(sheet_id))
+        except Exception as e:
+            logger.error(f"無法開啟 Sheet {sheet_id}: {e}")
+            return None
+
+        # 重新開啟時一併清除該 Spreadsheet 的分頁快取（與 Spreadsheet 同一 TTL）
+        with self._sheet_cache_lock:
+            self._sheet_cache[sheet_id] = (time.monotonic(), sheet)
+            for key in [k for k in self._ws_cache if k[0] == sheet_id]:
+                del self._ws_cache[key]
+        return sheet
+
+    def _get_ws(
+        self,
+        sheet: gspread.Spreadsheet,
+        title: str,
+        rows: int,
+        cols: int
+    ) -> gspread.Worksheet:
+        """取得固定分頁（含快取；不存在時以 rows x cols 建立）"""
+        key = (sheet.id, title)
+        with self._sheet_cache_lock:
+            worksheet = self._ws_cache.get(key)
+        if worksheet:
+            return worksheet
+
+        try:
+            worksheet = _execute_with_retry(lambda: sheet.worksheet(title))
+        except gspread.WorksheetNotFound:
+            worksheet = _execute_with_retry(
+                lambda: sheet.add_worksheet(title=title, rows=rows, cols=cols)
+            )
+
+        with self._sheet_cache_lock:
+            self._ws_cache[key] = worksheet
+        return worksheet
+
+    def _invalidate_sheet(self, sheet_id: str, error: Exception):
+        """
+        Spreadsheet 失效時移除快取，下次重新開啟
+
+        憑證失效 (401)、無權限 (403)、不存在 (404 / SpreadsheetNotFound) 才移除；
+        429 / 5XX 為暫時性錯誤，保留快取避免重開增加配額用量。
+        """
+        if isinstance(error, gspread.exceptions.SpreadsheetNotFound) or (
+            isinstance(error, gspread.exceptions.APIError)
+            and (
+                getattr(error.response, "status_code", None) in SHEET_CACHE_INVALIDATE_STATUS
+                or "UNAUTHENTICATED" in str(error)
+            )
+        ):
+            with self._sheet_cache_lock:
+                self._sheet_cache.pop(sheet_id, None)
+                for key in [k for k in self._ws_cache if k[0] == sheet_id]:
+                    del self._ws_cache[key]
 
     def _format_date_tab(self, target_date: date) -> str:
         """格式化日期為分頁名稱 (YYMMDD)"""
-        return target_date.strftime("%y%m%d")
+        return f"{target_date.year % 100:02d}{target_date.month:02d}{target_date.day:02d}"
+
+    # ==================== 資料列格式化 ====================
+
+    @staticmethod
+    def _company_info_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """公司資訊六欄（缺值補預設：股名空白、公司名沿用股名、其餘 "-"）"""
+        stock_name = df["stock_name"].fillna("")
+        return pd.DataFrame({
+            "stock_id": df["stock_id"].fillna(""),
+            "stock_name": stock_name,
+            "company_name": df["company_name"].fillna(stock_name),
+            "industry_category": df["industry_category"].fillna("-"),
+            "industry_category2": df["industry_category2"].fillna("-"),
+            "product_mix": df["product_mix"].fillna("-"),
+        })
+
+    @staticmethod
+    def _to_float(values: pd.Series) -> pd.Series:
+        """轉為 float 欄位（None / 非數值 / inf 一律轉 NaN，後續只需判斷 NaN）"""
+        values = pd.to_numeric(values, errors="coerce").astype(float)
+        return values.where(np.isfinite(values))
+
+    @staticmethod
+    def _sort_desc(
+        df: pd.DataFrame,
+        column: str,
+        top_k: Optional[int] = None
+    ) -> pd.DataFrame:
+        """
+        依欄位降冪排序（無值置底，同值維持原順序）
+
+        指定 top_k 時以 nlargest 只取前 K 筆（O(N log K)），不足 K 筆再補無值列。
+        """
+        if top_k is None:
+            return df.sort_values(column, ascending=False, na_position="last", kind="stable")
+
+        top = df.nlargest(top_k, column, keep="first")
+        if len(top) < top_k:
+            top = pd.concat([top, df[df[column].isna()].head(top_k - len(top))])
+        return top
+
+    @staticmethod
+    def _number_or_dash(values: pd.Series) -> pd.Series:
+        """數值欄位保留原始數值（顯示格式由分頁設定），NaN 顯示為 "-" """
+        return values.astype(object).where(values.notna(), "-")
+
+    @staticmethod
+    def _format_flag(values: pd.Series) -> np.ndarray:
+        """布林欄位轉為 "O" / 空白"""
+        return np.where(values.eq(True), "O", "")
+
+    def _verification_rows(
+        self,
+        data: Union[list[dict], pd.DataFrame],
+        columns: list[str]
+    ) -> list[list]:
+        """
+        驗證資料轉為資料列
+
+        入口處一次清除 inf，之後依欄位推斷型別整欄處理：
+        布林欄位轉為 "O" / 空白，浮點欄位四捨五入到小數 4 位，其餘轉為字串；
+        NaN 一律留空。傳入 DataFrame 時直接取欄位，不經 dict 列表轉換。
+        """
+        if isinstance(data, pd.DataFrame):
+            df = data.reindex(columns=columns)
+        else:
+            df = pd.DataFrame(data, columns=columns)
+        df = df.replace([np.inf, -np.inf], np.nan)
+        for name, col in df.items():
+            kind = pd.api.types.infer_dtype(col, skipna=True)
+            if kind == "boolean":
+                df[name] = self._format_flag(col)
+            elif kind in ("floating", "mixed-integer-float"):
+                df[name] = self._to_float(col).round(4).astype(object).where(col.notna(), "")
+            else:
+                df[name] = col.where(col.notna(), "").astype(str)
+        return df.to_numpy().tolist()
+
+    # ==================== batchUpdate 請求組裝 ====================
+
+    @staticmethod
+    def _to_cell(value) -> dict:
+        """轉換為 Sheets API CellData（等同 RAW 寫入）"""
+        if value is None or value == "":
+            return {}
+        if isinstance(value, (bool, np.bool_)):
+            return {"userEnteredValue": {"boolValue": bool(value)}}
+        if isinstance(value, (int, float, np.integer, np.floating)):
+            return {"userEnteredValue": {"numberValue": float(value)}}
+        return {"userEnteredValue": {"stringValue": str(value)}}
+
+    def _update_cells_request(
+        self,
+        sheet_gid: int,
+        rows: list[list],
+        start_row: int = 0
+    ) -> dict:
+        """產生 updateCells 請求（start_row 從 0 起算）"""
+        return {
+            "updateCells": {
+                "start": {"sheetId": sheet_gid, "rowIndex": start_row, "columnIndex": 0},
+                "rows": [{"values": [self._to_cell(v) for v in row]} for row in rows],
+                "fields": "userEnteredValue",
+            }
+        }
+
+    @staticmethod
+    def _number_format_request(
+        sheet_gid: int,
+        column: int,
+        pattern: str,
+        format_type: str = "NUMBER"
+    ) -> dict:
+        """產生整欄數字格式請求（表頭列除外，column 從 0 起算）"""
+        return {
+            "repeatCell": {
+                "range": {
+                    "sheetId": sheet_gid,
+                    "startRowIndex": 1,
+                    "startColumnIndex": column,
+                    "endColumnIndex": column + 1,
+                },
+                "cell": {
+                    "userEnteredFormat": {
+                        "numberFormat": {"type": format_type, "pattern": pattern}
+                    }
+                },
+                "fields": "userEnteredFormat.numberFormat",
+            }
+        }
+
+    def _replace_tab_requests(
+        self,
+        sheet: gspread.Spreadsheet,
+        tab_name: str,
+        rows: int,
+        cols: int,
+        index: int = 1,
+        worksheets: Optional[list[gspread.Worksheet]] = None
+    ) -> tuple[list[dict], int, list[tuple[int, str]]]:
+        """
+        產生「刪除同名分頁 + 新增分頁」請求
+
+        新分頁的 sheetId 由本地指定，後續 updateCells 可在同一批次引用。
+
+        Args:
+            worksheets: 已取得的分頁列表（可選，未提供時重新讀取）
+
+        Returns:
+            (requests, 新分頁 sheetId, 執行後的頁籤順序 [(sheetId, title)])
+        """
+        if worksheets is None:
+            worksheets = _execute_with_retry(sheet.worksheets)
+        new_gid = max((ws.id for ws in worksheets), default=0) + 1
+
+        requests = [
+            {"deleteSheet": {"sheetId": ws.id}}
+            for ws in worksheets if ws.title == tab_name
+        ]
+        requests.append({
+            "addSheet": {
+                "properties": {
+                    "sheetId": new_gid,
+                    "title": tab_name,
+                    "index": index,
+                    "gridProperties": {"rowCount": rows, "columnCount": cols},
+                }
+            }
+        })
+
+        tabs = [(ws.id, ws.title) for ws in worksheets if ws.title != tab_name]
+        tabs.insert(min(index, len(tabs)), (new_gid, tab_name))
+        return requests, new_gid, tabs
+
+    def _batch_update(self, sheet: gspread.Spreadsheet, requests: list[dict]):
+        """
+        送出 spreadsheets.batchUpdate（依 GSHEET_BATCH_MAX_REQUESTS 分批）
+
+        一般匯出請求數遠低於上限，整批單次送出並維持原子性。
+        """
+        for i in range(0, len(requests), GSHEET_BATCH_MAX_REQUESTS):
+            chunk = requests[i:i + GSHEET_BATCH_MAX_REQUESTS]
+            _execute_with_retry(lambda: sheet.batch_update({"requests": chunk}))
+
+    @staticmethod
+    def _sort_tab_requests(
+        tabs: list[tuple[int, str]],
+        fixed_tabs: Optional[list[str]] = None
+    ) -> list[dict]:
+        """
+        產生頁籤排序請求（固定頁籤 + 日期頁籤降序，最新在前）
+
+        依目標順序模擬搬移，只對實際錯位的頁籤產生 updateSheetProperties；
+        每日匯出通常只有新分頁錯位，批次內僅一筆請求。
+
+        Args:
+            tabs: 目前頁籤順序 [(sheetId, title)]
+            fixed_tabs: 固定在最前面的頁籤名稱列表
+        """
+        fixed_tabs = fixed_tabs or []
+        fixed = [gid for gid, title in tabs if title in fixed_tabs]
+        dated = [
+            gid for gid, title in sorted(
+                (t for t in tabs if t[1] not in fixed_tabs and _DATE_TAB_RE.match(t[1])),
+                key=lambda t: t[1],
+                reverse=True,
+            )
+        ]
+
+        # 依序放置目標位置，前面的位置已就定位，搬移一律往前（index 不需位移修正）
+        order = [gid for gid, _ in tabs]
+        requests = []
+        for idx, gid in enumerate(fixed + dated):
+            if order[idx] == gid:
+                continue
+            order.remove(gid)
+            order.insert(idx, gid)
+            requests.append({
+                "updateSheetProperties": {
+                    "properties": {"sheetId": gid, "index": idx},
+                    "fields": "index",
+                }
+            })
+        return requests
+
+    def _overwrite_values(
+        self,
+        sheet: gspread.Spreadsheet,
+        worksheet: gspread.Worksheet,
+        rows: list[list],
+        cols: int
+    ):
+        """
+        以單次 values.batchUpdate 覆寫分頁內容（取代 clear + update）
+
+        新資料之後到原有 row_count 的範圍以空字串覆蓋，清除殘留的舊資料。
+        rows 每列需恰為 cols 欄（呼叫端組出固定形狀），不足的列不會清除右側舊值。
+        """
+        data = [{
+            "range": absolute_range_name(worksheet.title, "A1"),
+            "values": rows,
+        }]
+        old_rows = worksheet.row_count
+        if old_rows > len(rows):
+            data.append({
+                "range": absolute_range_name(
+                    worksheet.title,
+                    f"{rowcol_to_a1(len(rows) + 1, 1)}:{rowcol_to_a1(old_rows, cols)}",
+                ),
+                "values": [[""] * cols] * (old_rows - len(rows)),
+            })
+
+        pending = self._pending_writes()
+        if pending is not None:
+            pending.setdefault(sheet.id, (sheet, []))[1].extend(data)
+            return
+
+        _execute_with_retry(lambda: sheet.values_batch_update({
+            "valueInputOption": "RAW",
+            "data": data,
+        }))
+
+    @contextmanager
+    def batch_writes(self) -> Generator[None, None, None]:
+        """
+        合併區塊內的值寫入（Context Manager）
+
+        區塊內 _overwrite_values 的寫入先暫存，離開時每個 Spreadsheet
+        只送出一次 values.batchUpdate。暫存只作用於目前執行緒。
+
+        區塊內各匯出方法的回傳值只代表「已暫存」；實際送出失敗時，
+        離開區塊會拋出例外。區塊內發生例外則捨棄暫存的寫入。
+
+        Raises:
+            gspread.exceptions.GSpreadException: 暫存的寫入送出失敗
+        """
+        self._local.pending = {}
+        try:
+            yield
+        except BaseException:
+            self._local.pending = None
+            raise
+        self.flush()
+
+    def _pending_writes(self) -> Optional[dict[str, tuple[gspread.Spreadsheet, list[dict]]]]:
+        """目前執行緒的暫存寫入（未在 batch_writes 區塊內時為 None）"""
+        return getattr(self._local, "pending", None)
+
+    def flush(self):
+        """
+        送出目前執行緒暫存的值寫入（每個 Spreadsheet 一次 values.batchUpdate）
+
+        Raises:
+            gspread.exceptions.GSpreadException: 任一 Spreadsheet 寫入失敗（其餘仍會嘗試送出）
+        """
+        pending, self._local.pending = self._pending_writes() or {}, None
+        failed = []
+        for spreadsheet_id, (sheet, data) in pending.items():
+            try:
+                _execute_with_retry(lambda: sheet.values_batch_update({
+                    "valueInputOption": "RAW",
+                    "data": data,
+                }))
+            except Exception as e:
+                self._invalidate_sheet(spreadsheet_id, e)
+                logger.error(f"批次寫入失敗 ({spreadsheet_id}): {e}")
+                failed.append(spreadsheet_id)
+
+        if failed:
+            raise gspread.exceptions.GSpreadException(
+                f"批次寫入失敗: {', '.join(failed)}"
+            )
+
+    # ==================== 匯出雜湊 ====================
+
+    @staticmethod
+    def _rows_hash(rows: list[list]) -> str:
+        """計算匯出內容的雜湊值（標題列 + 資料列）"""
+        payload = json.dumps(rows, ensure_ascii=False, default=str).encode("utf-8")
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def _is_unchanged(
+        self,
+        sheet_id: str,
+        tab: str,
+        digest: str,
+        worksheets: list[gspread.Worksheet]
+    ) -> bool:
+        """
+        比對本地記錄的上次匯出雜湊，相同表示內容未變
+
+        分頁已不存在（在 Sheets 上被刪除）時一律視為有變更，重新上傳補回。
+        """
+        if self.db is None:
+            return False
+        if not any(ws.title == tab for ws in worksheets):
+            return False
+        try:
+            return self.db.get_export_hash(sheet_id, tab) == digest
+        except Exception as e:
+            logger.warning(f"讀取匯出雜湊失敗 ({tab}): {e}")
+            return False
+
+    def _save_export_hash(self, sheet_id: str, tab: str, digest: str) -> None:
+        """匯出成功後記錄本次內容雜湊"""
+        if self.db is None:
+            return
+        try:
+            self.db.set_export_hash(sheet_id, tab, digest)
+        except Exception as e:
+            logger.warning(f"寫入匯出雜湊失敗 ({tab}): {e}")
 
     # ==================== 公司主檔 ====================
 
@@ -128,44 +662,31 @@ class GoogleSheetExporter:
             headers = ["代號", "股名", "公司名", "產業分類1", "產業分類2", "產品組合"]
 
             # 取得或建立「台股公司主檔」分頁
-            is_first_time = False
-            try:
-                worksheet = sheet.worksheet("台股公司主檔")
-            except gspread.WorksheetNotFound:
-                worksheet = sheet.add_worksheet(
-                    title="台股公司主檔",
-                    rows=len(data) + 1,
-                    cols=6
-                )
-                is_first_time = True
+            worksheet = self._get_ws(sheet, "台股公司主檔", rows=len(data) + 1, cols=6)
 
             # 每月任務：清空並重寫所有資料（確保產業分類等欄位都是最新的）
-            sorted_data = sorted(data, key=lambda x: x.get("stock_id", ""))
-            rows = [headers] + [
-                [
-                    row.get("stock_id", ""),
-                    row.get("stock_name", ""),
-                    row.get("company_name", row.get("stock_name", "")),
-                    row.get("industry_category", "-"),
-                    row.get("industry_category2", "-"),
-                    row.get("product_mix", "-"),
-                ]
-                for row in sorted_data
-            ]
+            df = pd.DataFrame(data).reindex(columns=_COMPANY_COLS)
+            table = self._company_info_frame(df).sort_values("stock_id", kind="stable")
+            rows = [headers] + table.to_numpy().tolist()
 
             # 確保行數足夠
             required_rows = len(rows) + 10
             if worksheet.row_count < required_rows:
-                worksheet.add_rows(required_rows - worksheet.row_count)
+                _execute_with_retry(
+                    lambda: worksheet.add_rows(required_rows - worksheet.row_count)
+                )
 
-            # 清空並重寫
-            worksheet.clear()
-            worksheet.update(rows, "A1")
-            logger.info(f"公司主檔匯出完成: {len(data)} 筆")
+            # 覆寫（含清除舊資料殘留列）
+            self._overwrite_values(sheet, worksheet, rows, cols=6)
+            if self._pending_writes() is not None:
+                logger.info(f"公司主檔已暫存，待批次送出: {len(data)} 筆")
+            else:
+                logger.info(f"公司主檔匯出完成: {len(data)} 筆")
 
             return True
 
         except Exception as e:
+            self._invalidate_sheet(sheet_id, e)
             logger.error(f"公司主檔匯出失敗: {e}")
             return False
 
@@ -173,7 +694,8 @@ class GoogleSheetExporter:
         self,
         sheet_id: Optional[str] = None,
         note: str = "",
-        success: bool = True
+        success: bool = True,
+        time_str: Optional[str] = None
     ) -> bool:
         """
         更新公司主檔更新紀錄（統一表格格式）
@@ -187,10 +709,33 @@ class GoogleSheetExporter:
             sheet_id: Sheet ID
             note: 備註（如 "VCP 257 檔, 三線 111 檔"）
             success: 是否成功
+            time_str: 紀錄時間（未指定時取現在時間；批次呼叫時由呼叫端統一傳入）
+
+        Returns:
+            是否成功
+        """
+        time_str = time_str or datetime.now().strftime(LOG_TIME_FORMAT)
+        status = "成功" if success else "失敗"
+        return self.write_company_master_logs([(time_str, status, note)], sheet_id)
+
+    def write_company_master_logs(
+        self,
+        records: list[tuple[str, str, str]],
+        sheet_id: Optional[str] = None
+    ) -> bool:
+        """
+        批次寫入多筆更新紀錄（一次讀取 + 一次寫入）
+
+        Args:
+            records: (時間, 狀態, 備註) 列表，依序置於最上方
+            sheet_id: Sheet ID
 
         Returns:
             是否成功
         """
+        if not records:
+            return True
+
         sheet_id = sheet_id or SHEET_IDS.get("company_master")
         if not sheet_id:
             return False
@@ -201,48 +746,34 @@ class GoogleSheetExporter:
 
         try:
             # 取得或建立「台股更新紀錄」分頁
-            try:
-                worksheet = sheet.worksheet("台股更新紀錄")
-            except gspread.WorksheetNotFound:
-                worksheet = sheet.add_worksheet(
-                    title="台股更新紀錄",
-                    rows=100,
-                    cols=3
-                )
-
-            # 取得現有資料
-            existing_data = worksheet.get_all_values()
+            worksheet = self._get_ws(sheet, "台股更新紀錄", rows=100, cols=3)
 
-            # 準備新記錄
-            now = datetime.now()
-            time_str = now.strftime("%Y-%m-%d %H:%M:%S")
-            status = "成功" if success else "失敗"
-            new_record = [time_str, status, note]
+            # 取得現有資料（只讀取保留範圍：標題 + 表頭 + 100 筆）
+            existing_data = [
+                row + [""] * (3 - len(row))
+                for row in _execute_with_retry(lambda: worksheet.get("A1:C102"))
+            ]
 
             # 建立完整資料（標題 + 表頭 + 新記錄 + 舊記錄）
-            title_row = ["更新紀錄"]
+            title_row = ["更新紀錄", "", ""]
             header_row = ["時間", "狀態", "備註"]
 
-            # 取得舊記錄（跳過標題和表頭）
-            old_records = []
-            if len(existing_data) > 2:
-                old_records = existing_data[2:]
-
-            # 組合：新記錄在最上面
-            all_rows = [title_row, header_row, new_record] + old_records
+            # 組合：新記錄在最上面，舊記錄跳過標題和表頭
+            new_records = [list(r) for r in records]
+            all_rows = [title_row, header_row] + new_records + existing_data[2:]
 
-            # 限制最多保留 100 筆記錄
-            if len(all_rows) > 102:  # 標題 + 表頭 + 100筆
-                all_rows = all_rows[:102]
+            # 限制最多保留 100 筆記錄（標題 + 表頭 + 100筆）
+            all_rows = all_rows[:102]
 
-            # 清空並重新寫入
-            worksheet.clear()
-            worksheet.update(all_rows, "A1")
+            # 覆寫（含清除舊資料殘留列）
+            self._overwrite_values(sheet, worksheet, all_rows, cols=3)
 
-            logger.info(f"更新紀錄已記錄: {time_str} | {status} | {note}")
+            for time_str, status, note in records:
+                logger.info(f"更新紀錄已記錄: {time_str} | {status} | {note}")
             return True
 
         except Exception as e:
+            self._invalidate_sheet(sheet_id, e)
             logger.error(f"更新紀錄寫入失敗: {e}")
             return False
 
@@ -254,7 +785,7 @@ class GoogleSheetExporter:
         """
         將錯誤日誌寫入 Google Sheet「台股更新紀錄」分頁（統一表格格式）
 
-        使用 update_company_master_log() 寫入失敗記錄
+        所有錯誤合併為一次 write_company_master_logs() 寫入
 
         Args:
             error_logs: 錯誤日誌列表，每項包含 time, retry_count, status_code
@@ -266,13 +797,11 @@ class GoogleSheetExporter:
         if not error_logs:
             return True
 
-        # 將錯誤日誌轉換為統一格式寫入
-        for log in error_logs:
+        def format_note(log: dict) -> str:
             status_code = log.get("status_code", "")
             retry_count = log.get("retry_count", 0)
             params = log.get("params", {})
 
-            # 組合備註
             note = f"HTTP {status_code}"
             if retry_count > 0:
                 note += f" (重試 {retry_count} 次)"
@@ -280,13 +809,13 @@ class GoogleSheetExporter:
                 dataset = params.get("dataset", "")
                 if dataset:
                     note += f" - {dataset}"
+            return note
 
-            # 使用統一格式寫入
-            self.update_company_master_log(
-                sheet_id=sheet_id,
-                note=note,
-                success=False
-            )
+        time_str = datetime.now().strftime(LOG_TIME_FORMAT)
+        new_records = [(time_str, "失敗", format_note(log)) for log in error_logs]
+
+        if not self.write_company_master_logs(new_records, sheet_id):
+            return False
 
         logger.info(f"已寫入 {len(error_logs)} 筆錯誤日誌到 Google Sheet")
         return True
@@ -297,7 +826,8 @@ class GoogleSheetExporter:
         self,
         data: list[dict],
         target_date: date,
-        sheet_id: Optional[str] = None
+        sheet_id: Optional[str] = None,
+        top_k: Optional[int] = None
     ) -> bool:
         """
         匯出 VCP 篩選結果
@@ -306,6 +836,7 @@ class GoogleSheetExporter:
             data: VCP 篩選結果列表
             target_date: 篩選日期
             sheet_id: Sheet ID
+            top_k: 只匯出排序後前 K 筆（預設全部）
 
         Returns:
             是否成功
@@ -322,87 +853,51 @@ class GoogleSheetExporter:
         try:
             tab_name = self._format_date_tab(target_date)
 
-            # 建立新分頁（插入在第二位）
-            try:
-                # 如果分頁已存在，先刪除
-                existing = sheet.worksheet(tab_name)
-                sheet.del_worksheet(existing)
-            except gspread.WorksheetNotFound:
-                pass
-
-            worksheet = sheet.add_worksheet(
-                title=tab_name,
-                rows=max(len(data) + 1, 2),  # 至少 2 行（標題+1資料）
-                cols=9,
-                index=1  # 插入在第二個位置
-            )
-
             # 標題列
             headers = [
                 "代號", "股名", "公司名", "產業分類1", "產業分類2",
                 "產品組合", "近20日股價漲幅", "強勢清單", "新高清單"
             ]
 
-            # 資料列（處理 NaN/inf 值）
-            def safe_return(val):
-                """安全格式化報酬率"""
-                if val is None or (isinstance(val, float) and (pd.isna(val) or np.isinf(val))):
-                    return "-"
-                return f"{val * 100:.2f}%"
-
-            # SPEC: 資料排序依 "近20日股價漲幅" 降冪排序
-            def sort_key_return(row):
-                """排序用：處理 None 和 NaN"""
-                val = row.get("return_20d")
-                if val is None or (isinstance(val, float) and pd.isna(val)):
-                    return float("-inf")
-                return val
-
-            sorted_data = sorted(data, key=sort_key_return, reverse=True)
-
-            rows = [headers] + [
-                [
-                    row.get("stock_id", ""),
-                    row.get("stock_name", ""),
-                    row.get("company_name", row.get("stock_name", "")),
-                    row.get("industry_category", "-"),
-                    row.get("industry_category2", "-"),
-                    row.get("product_mix", "-"),
-                    safe_return(row.get("return_20d")),
-                    "O" if row.get("is_strong") else "",
-                    "O" if row.get("is_new_high") else "",
-                ]
-                for row in sorted_data
-            ]
+            df = pd.DataFrame(data).reindex(columns=_VCP_COLS)
+            df["return_20d"] = self._to_float(df["return_20d"])
 
-            # 批次寫入
-            worksheet.update(rows, "A1")
+            # SPEC: 資料排序依 "近20日股價漲幅" 降冪排序（無值置底）
+            df = self._sort_desc(df, "return_20d", top_k)
 
-            logger.info(f"VCP 篩選結果匯出完成: {len(data)} 筆 -> {tab_name}")
+            # 資料列（數值直接送出，NaN/inf 顯示為 "-"）
+            table = self._company_info_frame(df)
+            table["return_20d"] = self._number_or_dash(df["return_20d"])
+            table["is_strong"] = self._format_flag(df["is_strong"])
+            table["is_new_high"] = self._format_flag(df["is_new_high"])
+
+            rows = [headers] + table.to_numpy().tolist()
+
+            digest = self._rows_hash(rows)
+            worksheets = _execute_with_retry(sheet.worksheets)
+            if self._is_unchanged(sheet_id, tab_name, digest, worksheets):
+                logger.info(f"VCP 匯出內容未變更，略過上傳: {tab_name}")
+                return True
 
-            # 自動排序頁籤（最新日期在前）
-            self.sort_worksheets_by_date(sheet_id)
+            # 單一 batchUpdate：重建分頁（插入在第二位）+ 寫入 + 數字格式 + 頁籤排序
+            # （batchUpdate 具原子性，失敗時可整批重送）
+            requests, new_gid, tabs = self._replace_tab_requests(
+                sheet, tab_name, rows=max(len(rows), 2), cols=9, worksheets=worksheets
+            )
+            requests.append(self._update_cells_request(new_gid, rows))
+            requests.append(self._number_format_request(
+                new_gid, _VCP_COLS.index("return_20d"), "0.00%", "PERCENT"
+            ))
+            requests += self._sort_tab_requests(tabs)
+            self._batch_update(sheet, requests)
+            self._save_export_hash(sheet_id, tab_name, digest)
+
+            logger.info(f"VCP 篩選結果匯出完成: {len(data)} 筆 -> {tab_name}")
 
             return True
 
-        except gspread.exceptions.APIError as e:
-            # Google API 限流，嘗試重試
-            if "RATE_LIMIT_EXCEEDED" in str(e) or "429" in str(e):
-                # 確認 worksheet 和 rows 已定義才能重試
-                if 'worksheet' in dir() and 'rows' in dir():
-                    for retry in range(GSHEET_MAX_RETRIES):
-                        logger.warning(f"Google API 限流，{GSHEET_RETRY_DELAY} 秒後重試 ({retry + 1}/{GSHEET_MAX_RETRIES})...")
-                        time.sleep(GSHEET_RETRY_DELAY * (retry + 1))
-                        try:
-                            worksheet.update(rows, "A1")
-                            logger.info(f"VCP 篩選結果匯出完成: {len(data)} 筆 -> {tab_name}")
-                            self.sort_worksheets_by_date(sheet_id)
-                            return True
-                        except Exception:
-                            continue
-            logger.error(f"VCP 匯出失敗: {e}")
-            return False
         except Exception as e:
+            self._invalidate_sheet(sheet_id, e)
             logger.error(f"VCP 匯出失敗: {e}")
             return False
 
@@ -412,7 +907,8 @@ class GoogleSheetExporter:
         self,
         data: list[dict],
         target_date: date,
-        sheet_id: Optional[str] = None
+        sheet_id: Optional[str] = None,
+        top_k: Optional[int] = None
     ) -> bool:
         """
         匯出三線開花篩選結果
@@ -421,6 +917,7 @@ class GoogleSheetExporter:
             data: 三線開花篩選結果列表
             target_date: 篩選日期
             sheet_id: Sheet ID
+            top_k: 只匯出排序後前 K 筆（預設全部）
 
         Returns:
             是否成功
@@ -437,92 +934,55 @@ class GoogleSheetExporter:
         try:
             tab_name = self._format_date_tab(target_date)
 
-            # 建立新分頁
-            try:
-                existing = sheet.worksheet(tab_name)
-                sheet.del_worksheet(existing)
-            except gspread.WorksheetNotFound:
-                pass
-
-            worksheet = sheet.add_worksheet(
-                title=tab_name,
-                rows=max(len(data) + 1, 2),  # 至少 2 行（標題+1資料）
-                cols=9,
-                index=1
-            )
-
             # 標題列
             headers = [
                 "代號", "股名", "公司名", "產業分類1", "產業分類2",
                 "產品組合", "今日股價", "55日內次高價", "差距比例"
             ]
 
-            # 資料列（處理 NaN/inf 值）
-            def safe_price(val):
-                """安全格式化價格"""
-                if val is None or (isinstance(val, float) and (pd.isna(val) or np.isinf(val))):
-                    return "-"
-                return f"{val:.2f}"
-
-            def safe_ratio(val):
-                """安全格式化比例"""
-                if val is None or (isinstance(val, float) and (pd.isna(val) or np.isinf(val))):
-                    return "-"
-                return f"{val * 100:.2f}%"
-
-            # SPEC: 資料排序依 "差距比例" 降冪排序
-            def sort_key_gap(row):
-                """排序用：處理 None 和 NaN"""
-                val = row.get("gap_ratio")
-                if val is None or (isinstance(val, float) and pd.isna(val)):
-                    return float("-inf")
-                return val
-
-            sorted_data = sorted(data, key=sort_key_gap, reverse=True)
-
-            rows = [headers] + [
-                [
-                    row.get("stock_id", ""),
-                    row.get("stock_name", ""),
-                    row.get("company_name", row.get("stock_name", "")),
-                    row.get("industry_category", "-"),
-                    row.get("industry_category2", "-"),
-                    row.get("product_mix", "-"),
-                    safe_price(row.get("today_price")),
-                    safe_price(row.get("second_high_55d")),
-                    safe_ratio(row.get("gap_ratio")),
-                ]
-                for row in sorted_data
-            ]
+            df = pd.DataFrame(data).reindex(columns=_SANXIAN_COLS)
+            for col in ["today_price", "second_high_55d", "gap_ratio"]:
+                df[col] = self._to_float(df[col])
 
-            # 批次寫入
-            worksheet.update(rows, "A1")
+            # SPEC: 資料排序依 "差距比例" 降冪排序（無值置底）
+            df = self._sort_desc(df, "gap_ratio", top_k)
 
-            logger.info(f"三線開花篩選結果匯出完成: {len(data)} 筆 -> {tab_name}")
+            # 資料列（數值直接送出，NaN/inf 顯示為 "-"）
+            table = self._company_info_frame(df)
+            for col in ["today_price", "second_high_55d", "gap_ratio"]:
+                table[col] = self._number_or_dash(df[col])
+
+            rows = [headers] + table.to_numpy().tolist()
+
+            digest = self._rows_hash(rows)
+            worksheets = _execute_with_retry(sheet.worksheets)
+            if self._is_unchanged(sheet_id, tab_name, digest, worksheets):
+                logger.info(f"三線開花 匯出內容未變更，略過上傳: {tab_name}")
+                return True
 
-            # 自動排序頁籤（最新日期在前）
-            self.sort_worksheets_by_date(sheet_id)
+            # 單一 batchUpdate：重建分頁（插入在第二位）+ 寫入 + 數字格式 + 頁籤排序
+            # （batchUpdate 具原子性，失敗時可整批重送）
+            requests, new_gid, tabs = self._replace_tab_requests(
+                sheet, tab_name, rows=max(len(rows), 2), cols=9, worksheets=worksheets
+            )
+            requests.append(self._update_cells_request(new_gid, rows))
+            requests += [
+                self._number_format_request(new_gid, _SANXIAN_COLS.index(col), "0.00")
+                for col in ["today_price", "second_high_55d"]
+            ]
+            requests.append(self._number_format_request(
+                new_gid, _SANXIAN_COLS.index("gap_ratio"), "0.00%", "PERCENT"
+            ))
+            requests += self._sort_tab_requests(tabs)
+            self._batch_update(sheet, requests)
+            self._save_export_hash(sheet_id, tab_name, digest)
+
+            logger.info(f"三線開花篩選結果匯出完成: {len(data)} 筆 -> {tab_name}")
 
             return True
 
-        except gspread.exceptions.APIError as e:
-            # Google API 限流，嘗試重試
-            if "RATE_LIMIT_EXCEEDED" in str(e) or "429" in str(e):
-                # 確認 worksheet 和 rows 已定義才能重試
-                if 'worksheet' in dir() and 'rows' in dir():
-                    for retry in range(GSHEET_MAX_RETRIES):
-                        logger.warning(f"Google API 限流，{GSHEET_RETRY_DELAY} 秒後重試 ({retry + 1}/{GSHEET_MAX_RETRIES})...")
-                        time.sleep(GSHEET_RETRY_DELAY * (retry + 1))
-                        try:
-                            worksheet.update(rows, "A1")
-                            logger.info(f"三線開花篩選結果匯出完成: {len(data)} 筆 -> {tab_name}")
-                            self.sort_worksheets_by_date(sheet_id)
-                            return True
-                        except Exception:
-                            continue
-            logger.error(f"三線開花匯出失敗: {e}")
-            return False
         except Exception as e:
+            self._invalidate_sheet(sheet_id, e)
             logger.error(f"三線開花匯出失敗: {e}")
             return False
 
@@ -530,8 +990,8 @@ class GoogleSheetExporter:
 
     def export_verification(
         self,
-        vcp_data: list[dict],
-        sanxian_data: list[dict],
+        vcp_data: Union[list[dict], pd.DataFrame],
+        sanxian_data: Union[list[dict], pd.DataFrame],
         target_date: date,
         market_return_20d: float = 0.0,
         sheet_id: Optional[str] = None
@@ -540,8 +1000,8 @@ class GoogleSheetExporter:
         匯出驗證資料（包含所有計算中間欄位）
 
         Args:
-            vcp_data: VCP 驗證資料列表（包含所有計算欄位）
-            sanxian_data: 三線開花驗證資料列表（包含所有計算欄位）
+            vcp_data: VCP 驗證資料（列表或 DataFrame，包含所有計算欄位）
+            sanxian_data: 三線開花驗證資料（列表或 DataFrame，包含所有計算欄位）
             target_date: 篩選日期
             market_return_20d: 大盤 20 日報酬率
             sheet_id: Sheet ID
@@ -561,29 +1021,8 @@ class GoogleSheetExporter:
         try:
             tab_name = self._format_date_tab(target_date)
 
-            # 建立新分頁
-            try:
-                existing = sheet.worksheet(tab_name)
-                sheet.del_worksheet(existing)
-            except gspread.WorksheetNotFound:
-                pass
-
-            # 計算總行數（VCP + 間隔 + 三線開花）
-            total_rows = max(len(vcp_data) + len(sanxian_data) + 10, 100)
-
-            worksheet = sheet.add_worksheet(
-                title=tab_name,
-                rows=total_rows,
-                cols=25,
-                index=1
-            )
-
-            current_row = 1
-
             # ========== VCP 驗證區塊 ==========
             vcp_title = [[f"=== VCP 驗證資料 ({target_date}) === 大盤20日報酬: {market_return_20d:.4f}"]]
-            worksheet.update(vcp_title, f"A{current_row}")
-            current_row += 1
 
             vcp_headers = [
                 "stock_id", "date", "close_price", "high_price",
@@ -593,59 +1032,11 @@ class GoogleSheetExporter:
                 "cond4_ma200_up", "cond5_beat_market",
                 "is_strong", "is_new_high", "is_vcp"
             ]
-            worksheet.update([vcp_headers], f"A{current_row}")
-            current_row += 1
-
-            if vcp_data:
-                def safe_val(val):
-                    """安全格式化數值（處理 NaN/inf）"""
-                    if val is None:
-                        return ""
-                    if isinstance(val, bool):
-                        return "O" if val else ""
-                    if isinstance(val, float):
-                        if pd.isna(val) or np.isinf(val):
-                            return ""
-                        return round(val, 4)
-                    return str(val)
-
-                vcp_rows = []
-                for row in vcp_data:
-                    vcp_rows.append([
-                        safe_val(row.get("stock_id")),
-                        str(row.get("date", "")),
-                        safe_val(row.get("close_price")),
-                        safe_val(row.get("high_price")),
-                        safe_val(row.get("ma50")),
-                        safe_val(row.get("ma150")),
-                        safe_val(row.get("ma200")),
-                        safe_val(row.get("ma200_slope_20d")),
-                        safe_val(row.get("return_20d")),
-                        safe_val(row.get("high_5d")),
-                        safe_val(row.get("high_252d")),
-                        safe_val(row.get("gap_to_52w_high")),
-                        safe_val(row.get("cond1")),
-                        safe_val(row.get("cond2")),
-                        safe_val(row.get("cond3")),
-                        safe_val(row.get("cond4")),
-                        safe_val(row.get("cond5")),
-                        safe_val(row.get("is_strong")),
-                        safe_val(row.get("is_new_high")),
-                        safe_val(row.get("is_vcp")),
-                    ])
-
-                worksheet.update(vcp_rows, f"A{current_row}")
-                current_row += len(vcp_rows)
-
-            logger.info(f"VCP 驗證資料匯出完成: {len(vcp_data)} 筆")
 
-            # 間隔
-            current_row += 3
+            vcp_rows = self._verification_rows(vcp_data, _VERIFY_VCP_COLS)
 
             # ========== 三線開花驗證區塊 ==========
             sanxian_title = [[f"=== 三線開花驗證資料 ({target_date}) ==="]]
-            worksheet.update(sanxian_title, f"A{current_row}")
-            current_row += 1
 
             sanxian_headers = [
                 "stock_id", "date", "close_price",
@@ -654,57 +1045,126 @@ class GoogleSheetExporter:
                 "cond1_close>ma8", "cond2_ma8>ma21", "cond3_ma21>ma55",
                 "cond4_new_high", "is_sanxian"
             ]
-            worksheet.update([sanxian_headers], f"A{current_row}")
-            current_row += 1
-
-            if sanxian_data:
-                sanxian_rows = []
-                for row in sanxian_data:
-                    sanxian_rows.append([
-                        safe_val(row.get("stock_id")),
-                        str(row.get("date", "")),
-                        safe_val(row.get("close_price")),
-                        safe_val(row.get("ma8")),
-                        safe_val(row.get("ma21")),
-                        safe_val(row.get("ma55")),
-                        safe_val(row.get("high_55d")),
-                        safe_val(row.get("second_high_55d")),
-                        safe_val(row.get("gap_ratio")),
-                        safe_val(row.get("cond1")),
-                        safe_val(row.get("cond2")),
-                        safe_val(row.get("cond3")),
-                        safe_val(row.get("cond4")),
-                        safe_val(row.get("is_sanxian")),
-                    ])
-
-                worksheet.update(sanxian_rows, f"A{current_row}")
 
-            logger.info(f"三線開花驗證資料匯出完成: {len(sanxian_data)} 筆 -> {tab_name}")
+            sanxian_rows = self._verification_rows(sanxian_data, _VERIFY_SANXIAN_COLS)
+
+            # VCP 區塊 + 3 列間隔 + 三線開花區塊
+            vcp_block = vcp_title + [vcp_headers] + vcp_rows
+            sanxian_start = len(vcp_block) + 3
+            sanxian_block = sanxian_title + [sanxian_headers] + sanxian_rows
+
+            # 計算總行數（VCP + 間隔 + 三線開花）
+            total_rows = max(len(vcp_data) + len(sanxian_data) + 10, 100)
 
-            # 自動排序頁籤（最新日期在前）
-            self.sort_worksheets_by_date(sheet_id)
+            # 單一 batchUpdate：重建分頁 + 兩個區塊寫入 + 頁籤排序
+            requests, new_gid, tabs = self._replace_tab_requests(
+                sheet, tab_name, rows=total_rows, cols=25
+            )
+            requests.append(self._update_cells_request(new_gid, vcp_block))
+            requests.append(
+                self._update_cells_request(new_gid, sanxian_block, start_row=sanxian_start)
+            )
+            requests += self._sort_tab_requests(tabs)
+            self._batch_update(sheet, requests)
+
+            logger.info(f"VCP 驗證資料匯出完成: {len(vcp_data)} 筆")
+            logger.info(f"三線開花驗證資料匯出完成: {len(sanxian_data)} 筆 -> {tab_name}")
 
             return True
 
-        except gspread.exceptions.APIError as e:
-            if "RATE_LIMIT_EXCEEDED" in str(e) or "429" in str(e):
-                for retry in range(GSHEET_MAX_RETRIES):
-                    logger.warning(f"Google API 限流，{GSHEET_RETRY_DELAY} 秒後重試 ({retry + 1}/{GSHEET_MAX_RETRIES})...")
-                    time.sleep(GSHEET_RETRY_DELAY * (retry + 1))
-                    try:
-                        # 重試匯出（已包含排序）
-                        return self.export_verification(
-                            vcp_data, sanxian_data, target_date,
-                            market_return_20d, sheet_id
-                        )
-                    except Exception:
-                        continue
+        except Exception as e:
+            self._invalidate_sheet(sheet_id, e)
             logger.error(f"驗證資料匯出失敗: {e}")
             return False
+
+    def replace_tab_values(
+        self,
+        sheet_id: str,
+        tab_name: str,
+        values: list[list],
+        index: int = 0
+    ) -> bool:
+        """
+        重建分頁並寫入資料（刪除同名分頁 + 新增分頁 + 寫入值）
+
+        建立分頁逐一進行（持鎖至 batchUpdate 完成，其他執行緒才會看到新的 sheetId），
+        寫入值不持鎖，多個分頁可並行；兩者皆經 429 / 5XX 重試。
+
+        Args:
+            sheet_id: Sheet ID
+            tab_name: 分頁名稱
+            values: 寫入的資料列（含標題列）
+            index: 新分頁位置
+
+        Returns:
+            是否成功
+        """
+        sheet = self._get_sheet(sheet_id)
+        if not sheet:
+            return False
+
+        try:
+            cols = max((len(row) for row in values), default=0)
+            with self._tab_lock:
+                requests, _, _ = self._replace_tab_requests(
+                    sheet, tab_name, rows=len(values) + 10, cols=cols + 5, index=index
+                )
+                self._batch_update(sheet, requests)
+
+            # 直接呼叫 values.update，不經 Worksheet 層轉換
+            _execute_with_retry(lambda: sheet.values_update(
+                absolute_range_name(tab_name, "A1"),
+                params={"valueInputOption": "RAW"},
+                body={"values": values},
+            ))
+            return True
+
         except Exception as e:
-            logger.error(f"驗證資料匯出失敗: {e}")
+            self._invalidate_sheet(sheet_id, e)
+            logger.error(f"{tab_name} 匯出失敗: {e}")
             return False
 
+    # ==================== 並行匯出 ====================
+
+    def export_all(
+        self,
+        vcp_data: list[dict],
+        sanxian_data: list[dict],
+        vcp_verification: Union[list[dict], pd.DataFrame],
+        sanxian_verification: Union[list[dict], pd.DataFrame],
+        target_date: date,
+        market_return_20d: float = 0.0
+    ) -> dict[str, bool]:
+        """
+        並行匯出 VCP、三線開花與驗證資料
+
+        三者寫入不同 Spreadsheet，以執行緒並行（I/O 期間釋放 GIL），
+        匯出時間約為最慢一項；無資料的項目略過。
+
+        Returns:
+            {"vcp": 是否成功, "sanxian": ..., "verification": ...}（僅含有執行的項目）
+        """
+        jobs = {}
+        if vcp_data:
+            jobs["vcp"] = (self.export_vcp, vcp_data, target_date)
+        if sanxian_data:
+            jobs["sanxian"] = (self.export_sanxian, sanxian_data, target_date)
+        if len(vcp_verification) or len(sanxian_verification):
+            jobs["verification"] = (
+                self.export_verification,
+                vcp_verification, sanxian_verification, target_date, market_return_20d,
+            )
+
+        if not jobs:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=min(GSHEET_EXPORT_WORKERS, len(jobs))) as executor:
+            futures = {
+                name: executor.submit(fn, *args)
+                for name, (fn, *args) in jobs.items()
+            }
+            return {name: future.result() for name, future in futures.items()}
+
     def sort_worksheets_by_date(
         self,
         sheet_id: str,
@@ -720,44 +1180,61 @@ class GoogleSheetExporter:
         Returns:
             是否成功
         """
-        import re
-
         sheet = self._get_sheet(sheet_id)
         if not sheet:
             return False
 
         try:
-            worksheets = sheet.worksheets()
-            fixed_tabs = fixed_tabs or []
-
-            # 分離固定頁籤和日期頁籤
-            fixed_worksheets = []
-            date_worksheets = []
-
-            for ws in worksheets:
-                if ws.title in fixed_tabs:
-                    fixed_worksheets.append(ws)
-                elif re.match(r"^\d{6}$", ws.title):  # YYMMDD 格式
-                    date_worksheets.append(ws)
-
-            # 日期頁籤按名稱降序排列（最新在前）
-            date_worksheets.sort(key=lambda x: x.title, reverse=True)
-
-            # 重新排序：固定頁籤 + 日期頁籤
-            new_order = fixed_worksheets + date_worksheets
+            worksheets = _execute_with_retry(sheet.worksheets)
+            tabs = [(ws.id, ws.title) for ws in worksheets]
 
-            # 更新每個頁籤的 index
-            for idx, ws in enumerate(new_order):
-                if ws.index != idx:
-                    ws.update_index(idx)
+            # 單一 batchUpdate，只搬移錯位的頁籤
+            requests = self._sort_tab_requests(tabs, fixed_tabs)
+            if requests:
+                self._batch_update(sheet, requests)
 
-            logger.info(f"頁籤排序完成: {len(new_order)} 個頁籤")
+            logger.info(f"頁籤排序完成: {len(requests)}/{len(tabs)} 個頁籤移動")
             return True
 
         except Exception as e:
+            self._invalidate_sheet(sheet_id, e)
             logger.error(f"頁籤排序失敗: {e}")
             return False
 
     def health_check(self) -> bool:
         """檢查 Google Sheets 連線狀態"""
         return self.client is not None
+
+    def reconnect(self) -> bool:
+        """
+        重新建立 Google Sheets 連線（如憑證先前尚未就緒）
+
+        Returns:
+            是否連線成功
+        """
+        with self._sheet_cache_lock:
+            self._sheet_cache.clear()
+            self._ws_cache.clear()
+        self._connect()
+        return self.health_check()
+
+
+@functools.lru_cache(maxsize=None)
+def _shared_exporter(db=None) -> GoogleSheetExporter:
+    return GoogleSheetExporter(db=db)
+
+
+def get_exporter(db=None) -> GoogleSheetExporter:
+    """
+    取得共用的匯出器（排程模式下各任務重用同一連線與 HTTP session）
+
+    依 db 分別快取，不同資料庫的匯出雜湊不會互相覆蓋。
+
+    Args:
+        db: SQLiteDatabase 實例（可選，提供時用於記錄匯出雜湊）
+    """
+    exporter = _shared_exporter(db)
+    if not exporter.health_check():
+        # 前次連線失敗（如憑證尚未就緒）時重新連線，避免快取到失效的匯出器
+        exporter.reconnect()
+    return exporter
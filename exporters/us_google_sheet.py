@@ -2,21 +2,80 @@
 美股 Google Sheet 匯出模組
 完全獨立於台股，使用獨立的 Sheet
 """
-import time
 from datetime import date, datetime
-from typing import Optional
+from typing import Callable, Optional, TypeVar
 
 import gspread
 import numpy as np
 import pandas as pd
 from google.oauth2.service_account import Credentials
+from gspread.utils import absolute_range_name
 from loguru import logger
+from tenacity import (
+    retry,
+    retry_if_exception,
+    stop_after_attempt,
+    wait_exponential_jitter,
+)
 
 from config.us_settings import GOOGLE_CREDENTIALS_PATH, US_SHEET_IDS
 
-# Google API 重試設定
-GSHEET_MAX_RETRIES = 3
-GSHEET_RETRY_DELAY = 5  # 秒
+# Google API 重試設定（指數退避 + jitter）
+US_GSHEET_MAX_ATTEMPTS = 5
+US_GSHEET_RETRY_INITIAL = 2  # 秒
+US_GSHEET_RETRY_MAX = 60  # 秒
+US_GSHEET_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# 各分頁資料欄位（dict key）
+_US_COMPANY_COLS = [
+    "stock_id", "stock_name", "company_name",
+    "sector", "industry_category", "industry", "industry_category2",
+]
+_US_VCP_COLS = _US_COMPANY_COLS + ["return_20d", "is_strong", "is_new_high"]
+_US_SANXIAN_COLS = _US_COMPANY_COLS + ["today_price", "second_high_55d", "gap_ratio"]
+_US_VERIFY_VCP_COLS = [
+    "stock_id", "date", "close_price", "high_price",
+    "ma50", "ma150", "ma200", "ma200_slope_20d",
+    "return_20d", "high_5d", "high_252d", "gap_to_52w_high",
+    "cond1", "cond2", "cond3", "cond4", "cond5",
+    "is_strong", "is_new_high", "is_vcp",
+]
+_US_VERIFY_SANXIAN_COLS = [
+    "stock_id", "date", "close_price",
+    "ma8", "ma21", "ma55",
+    "high_55d", "second_high_55d", "gap_ratio",
+    "cond1", "cond2", "cond3", "cond4", "is_sanxian",
+]
+
+T = TypeVar("T")
+
+
+def _is_retryable(e: BaseException) -> bool:
+    """判斷是否為可重試的 Google API 錯誤（429 / 5XX）"""
+    return (
+        isinstance(e, gspread.exceptions.APIError)
+        and getattr(e.response, "status_code", None) in US_GSHEET_RETRYABLE_STATUS
+    )
+
+
+def _log_retry(retry_state) -> None:
+    """重試前記錄警告"""
+    logger.warning(
+        f"Google API 暫時不可用，{retry_state.next_action.sleep:.1f} 秒後重試 "
+        f"({retry_state.attempt_number}/{US_GSHEET_MAX_ATTEMPTS - 1})..."
+    )
+
+
+@retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_exponential_jitter(initial=US_GSHEET_RETRY_INITIAL, max=US_GSHEET_RETRY_MAX),
+    stop=stop_after_attempt(US_GSHEET_MAX_ATTEMPTS),
+    before_sleep=_log_retry,
+    reraise=True,
+)
+def _execute_with_retry(fn: Callable[[], T]) -> T:
+    """執行 Google API 呼叫（429 / 5XX 自動重試）"""
+    return fn()
 
 
 class USGoogleSheetExporter:
@@ -83,6 +142,86 @@ class USGoogleSheetExporter:
         """格式化日期為分頁名稱 (YYMMDD)"""
         return target_date.strftime("%y%m%d")
 
+    def _replace_tab(
+        self,
+        sheet: gspread.Spreadsheet,
+        tab_name: str,
+        rows: int,
+        cols: int,
+        index: int = 1
+    ):
+        """刪除同名分頁並建立新分頁（合併為一次 batchUpdate）"""
+        requests = [
+            {"deleteSheet": {"sheetId": ws.id}}
+            for ws in _execute_with_retry(sheet.worksheets) if ws.title == tab_name
+        ]
+        requests.append({
+            "addSheet": {
+                "properties": {
+                    "title": tab_name,
+                    "index": index,
+                    "gridProperties": {"rowCount": rows, "columnCount": cols},
+                }
+            }
+        })
+        _execute_with_retry(lambda: sheet.batch_update({"requests": requests}))
+
+    @staticmethod
+    def _write_values(sheet: gspread.Spreadsheet, tab_name: str, rows: list[list]):
+        """從 A1 寫入資料（直接呼叫 values.update，不需先取得 Worksheet）"""
+        _execute_with_retry(lambda: sheet.values_update(
+            absolute_range_name(tab_name, "A1"),
+            params={"valueInputOption": "RAW"},
+            body={"values": rows},
+        ))
+
+    # ==================== 資料列格式化 ====================
+
+    @staticmethod
+    def _company_info_frame(df: pd.DataFrame) -> pd.DataFrame:
+        """公司資訊六欄（產業分類優先使用 sector / industry，空值顯示 "-"）"""
+        stock_name = df["stock_name"].fillna("")
+        sector = df["sector"].fillna(df["industry_category"])
+        industry = df["industry"].fillna(df["industry_category2"])
+        return pd.DataFrame({
+            "stock_id": df["stock_id"].fillna(""),
+            "stock_name": stock_name,
+            "company_name": df["company_name"].fillna(stock_name),
+            "sector": sector.where(sector.notna() & sector.ne(""), "-"),
+            "industry": industry.where(industry.notna() & industry.ne(""), "-"),
+            "product_mix": "-",
+        })
+
+    @staticmethod
+    def _to_float(values: pd.Series) -> pd.Series:
+        """轉為 float 欄位（None / 非數值 / inf 一律轉 NaN）"""
+        values = pd.to_numeric(values, errors="coerce").astype(float)
+        return values.where(np.isfinite(values))
+
+    @staticmethod
+    def _format_number(values: pd.Series, fmt: str) -> pd.Series:
+        """格式化數值欄位（NaN 顯示為 "-"）"""
+        return values.map(fmt.format, na_action="ignore").fillna("-")
+
+    @classmethod
+    def _verification_rows(cls, data: list[dict], columns: list[str]) -> list[list]:
+        """
+        驗證資料轉為資料列（整欄處理）
+
+        布林欄位轉為 "O" / 空白，浮點欄位四捨五入到小數 4 位，其餘轉為字串；
+        NaN / inf 一律留空。
+        """
+        df = pd.DataFrame(data, columns=columns).replace([np.inf, -np.inf], np.nan)
+        for name, col in df.items():
+            kind = pd.api.types.infer_dtype(col, skipna=True)
+            if kind == "boolean":
+                df[name] = np.where(col.eq(True), "O", "")
+            elif kind in ("floating", "mixed-integer-float"):
+                df[name] = cls._to_float(col).round(4).astype(object).where(col.notna(), "")
+            else:
+                df[name] = col.where(col.notna(), "").astype(str)
+        return df.to_numpy().tolist()
+
     # ==================== 美股公司主檔 ====================
 
     def export_company_master(
@@ -124,18 +263,9 @@ class USGoogleSheetExporter:
                 )
 
             # 每月任務：清空並重寫所有資料
-            sorted_data = sorted(data, key=lambda x: x.get("stock_id", ""))
-            rows = [headers] + [
-                [
-                    row.get("stock_id", ""),
-                    row.get("stock_name", ""),
-                    row.get("company_name", row.get("stock_name", "")),
-                    row.get("sector", row.get("industry_category", "-")) or "-",
-                    row.get("industry", row.get("industry_category2", "-")) or "-",
-                    "-",
-                ]
-                for row in sorted_data
-            ]
+            df = pd.DataFrame(data).reindex(columns=_US_COMPANY_COLS)
+            table = self._company_info_frame(df).sort_values("stock_id", kind="stable")
+            rows = [headers] + table.to_numpy().tolist()
 
             # 確保行數足夠
             required_rows = len(rows) + 10
@@ -288,58 +418,31 @@ class USGoogleSheetExporter:
         try:
             tab_name = self._format_date_tab(target_date)
 
-            # 建立新分頁（插入在第二位）
-            try:
-                existing = sheet.worksheet(tab_name)
-                sheet.del_worksheet(existing)
-            except gspread.WorksheetNotFound:
-                pass
-
-            worksheet = sheet.add_worksheet(
-                title=tab_name,
-                rows=max(len(data) + 1, 2),
-                cols=9,
-                index=1
-            )
-
             # 標題列
             headers = [
                 "代號", "股名", "公司名", "產業分類1", "產業分類2",
                 "產品組合", "近20日股價漲幅", "強勢清單", "新高清單"
             ]
 
-            # 資料列
-            def safe_return(val):
-                """安全格式化報酬率"""
-                if val is None or (isinstance(val, float) and (pd.isna(val) or np.isinf(val))):
-                    return "-"
-                return f"{val * 100:.2f}%"
-
-            def sort_key_return(row):
-                """排序用"""
-                val = row.get("return_20d")
-                if val is None or (isinstance(val, float) and pd.isna(val)):
-                    return float("-inf")
-                return val
-
-            sorted_data = sorted(data, key=sort_key_return, reverse=True)
-
-            rows = [headers] + [
-                [
-                    row.get("stock_id", ""),
-                    row.get("stock_name", ""),
-                    row.get("company_name", row.get("stock_name", "")),
-                    row.get("sector", row.get("industry_category", "-")) or "-",
-                    row.get("industry", row.get("industry_category2", "-")) or "-",
-                    "-",
-                    safe_return(row.get("return_20d")),
-                    "O" if row.get("is_strong") else "",
-                    "O" if row.get("is_new_high") else "",
-                ]
-                for row in sorted_data
-            ]
+            df = pd.DataFrame(data).reindex(columns=_US_VCP_COLS)
+            df["return_20d"] = self._to_float(df["return_20d"])
 
-            worksheet.update(rows, "A1")
+            # 依近20日股價漲幅降冪排序（無值置底）
+            df = df.sort_values(
+                "return_20d", ascending=False, na_position="last", kind="stable"
+            )
+
+            # 資料列（NaN/inf 顯示為 "-"）
+            table = self._company_info_frame(df)
+            table["return_20d"] = self._format_number(df["return_20d"], "{:.2%}")
+            table["is_strong"] = np.where(df["is_strong"].eq(True), "O", "")
+            table["is_new_high"] = np.where(df["is_new_high"].eq(True), "O", "")
+
+            rows = [headers] + table.to_numpy().tolist()
+
+            # 重建分頁（插入在第二位）為一次 batchUpdate，再以一次 values.update 寫入
+            self._replace_tab(sheet, tab_name, rows=max(len(rows), 2), cols=9)
+            self._write_values(sheet, tab_name, rows)
 
             logger.info(f"美股 VCP 篩選結果匯出完成: {len(data)} 筆 -> {tab_name}")
 
@@ -348,19 +451,6 @@ class USGoogleSheetExporter:
 
             return True
 
-        except gspread.exceptions.APIError as e:
-            if "RATE_LIMIT_EXCEEDED" in str(e) or "429" in str(e):
-                for retry in range(GSHEET_MAX_RETRIES):
-                    logger.warning(f"Google API 限流，{GSHEET_RETRY_DELAY} 秒後重試...")
-                    time.sleep(GSHEET_RETRY_DELAY * (retry + 1))
-                    try:
-                        worksheet.update(rows, "A1")
-                        logger.info(f"美股 VCP 篩選結果匯出完成: {len(data)} 筆")
-                        return True
-                    except Exception:
-                        continue
-            logger.error(f"美股 VCP 匯出失敗: {e}")
-            return False
         except Exception as e:
             logger.error(f"美股 VCP 匯出失敗: {e}")
             return False
@@ -396,61 +486,31 @@ class USGoogleSheetExporter:
         try:
             tab_name = self._format_date_tab(target_date)
 
-            try:
-                existing = sheet.worksheet(tab_name)
-                sheet.del_worksheet(existing)
-            except gspread.WorksheetNotFound:
-                pass
-
-            worksheet = sheet.add_worksheet(
-                title=tab_name,
-                rows=max(len(data) + 1, 2),
-                cols=9,
-                index=1
-            )
-
             headers = [
                 "代號", "股名", "公司名", "產業分類1", "產業分類2",
                 "產品組合", "今日股價", "55日內次高價", "差距比例"
             ]
 
-            def safe_price(val):
-                """安全格式化價格"""
-                if val is None or (isinstance(val, float) and (pd.isna(val) or np.isinf(val))):
-                    return "-"
-                return f"{val:.2f}"
-
-            def safe_ratio(val):
-                """安全格式化比例"""
-                if val is None or (isinstance(val, float) and (pd.isna(val) or np.isinf(val))):
-                    return "-"
-                return f"{val * 100:.2f}%"
-
-            def sort_key_gap(row):
-                """排序用"""
-                val = row.get("gap_ratio")
-                if val is None or (isinstance(val, float) and pd.isna(val)):
-                    return float("-inf")
-                return val
-
-            sorted_data = sorted(data, key=sort_key_gap, reverse=True)
-
-            rows = [headers] + [
-                [
-                    row.get("stock_id", ""),
-                    row.get("stock_name", ""),
-                    row.get("company_name", row.get("stock_name", "")),
-                    row.get("sector", row.get("industry_category", "-")) or "-",
-                    row.get("industry", row.get("industry_category2", "-")) or "-",
-                    "-",
-                    safe_price(row.get("today_price")),
-                    safe_price(row.get("second_high_55d")),
-                    safe_ratio(row.get("gap_ratio")),
-                ]
-                for row in sorted_data
-            ]
+            df = pd.DataFrame(data).reindex(columns=_US_SANXIAN_COLS)
+            for col in ["today_price", "second_high_55d", "gap_ratio"]:
+                df[col] = self._to_float(df[col])
 
-            worksheet.update(rows, "A1")
+            # 依差距比例降冪排序（無值置底）
+            df = df.sort_values(
+                "gap_ratio", ascending=False, na_position="last", kind="stable"
+            )
+
+            # 資料列（NaN/inf 顯示為 "-"）
+            table = self._company_info_frame(df)
+            table["today_price"] = self._format_number(df["today_price"], "{:.2f}")
+            table["second_high_55d"] = self._format_number(df["second_high_55d"], "{:.2f}")
+            table["gap_ratio"] = self._format_number(df["gap_ratio"], "{:.2%}")
+
+            rows = [headers] + table.to_numpy().tolist()
+
+            # 重建分頁（插入在第二位）為一次 batchUpdate，再以一次 values.update 寫入
+            self._replace_tab(sheet, tab_name, rows=max(len(rows), 2), cols=9)
+            self._write_values(sheet, tab_name, rows)
 
             logger.info(f"美股三線開花篩選結果匯出完成: {len(data)} 筆 -> {tab_name}")
 
@@ -458,19 +518,6 @@ class USGoogleSheetExporter:
 
             return True
 
-        except gspread.exceptions.APIError as e:
-            if "RATE_LIMIT_EXCEEDED" in str(e) or "429" in str(e):
-                for retry in range(GSHEET_MAX_RETRIES):
-                    logger.warning(f"Google API 限流，{GSHEET_RETRY_DELAY} 秒後重試...")
-                    time.sleep(GSHEET_RETRY_DELAY * (retry + 1))
-                    try:
-                        worksheet.update(rows, "A1")
-                        logger.info(f"美股三線開花篩選結果匯出完成: {len(data)} 筆")
-                        return True
-                    except Exception:
-                        continue
-            logger.error(f"美股三線開花匯出失敗: {e}")
-            return False
         except Exception as e:
             logger.error(f"美股三線開花匯出失敗: {e}")
             return False
@@ -544,42 +591,7 @@ class USGoogleSheetExporter:
             current_row += 1
 
             if vcp_data:
-                def safe_val(val):
-                    """安全格式化數值"""
-                    if val is None:
-                        return ""
-                    if isinstance(val, bool):
-                        return "O" if val else ""
-                    if isinstance(val, float):
-                        if pd.isna(val) or np.isinf(val):
-                            return ""
-                        return round(val, 4)
-                    return str(val)
-
-                vcp_rows = []
-                for row in vcp_data:
-                    vcp_rows.append([
-                        safe_val(row.get("stock_id")),
-                        str(row.get("date", "")),
-                        safe_val(row.get("close_price")),
-                        safe_val(row.get("high_price")),
-                        safe_val(row.get("ma50")),
-                        safe_val(row.get("ma150")),
-                        safe_val(row.get("ma200")),
-                        safe_val(row.get("ma200_slope_20d")),
-                        safe_val(row.get("return_20d")),
-                        safe_val(row.get("high_5d")),
-                        safe_val(row.get("high_252d")),
-                        safe_val(row.get("gap_to_52w_high")),
-                        safe_val(row.get("cond1")),
-                        safe_val(row.get("cond2")),
-                        safe_val(row.get("cond3")),
-                        safe_val(row.get("cond4")),
-                        safe_val(row.get("cond5")),
-                        safe_val(row.get("is_strong")),
-                        safe_val(row.get("is_new_high")),
-                        safe_val(row.get("is_vcp")),
-                    ])
+                vcp_rows = self._verification_rows(vcp_data, _US_VERIFY_VCP_COLS)
 
                 worksheet.update(vcp_rows, f"A{current_row}")
                 current_row += len(vcp_rows)
@@ -604,24 +616,7 @@ class USGoogleSheetExporter:
             current_row += 1
 
             if sanxian_data:
-                sanxian_rows = []
-                for row in sanxian_data:
-                    sanxian_rows.append([
-                        safe_val(row.get("stock_id")),
-                        str(row.get("date", "")),
-                        safe_val(row.get("close_price")),
-                        safe_val(row.get("ma8")),
-                        safe_val(row.get("ma21")),
-                        safe_val(row.get("ma55")),
-                        safe_val(row.get("high_55d")),
-                        safe_val(row.get("second_high_55d")),
-                        safe_val(row.get("gap_ratio")),
-                        safe_val(row.get("cond1")),
-                        safe_val(row.get("cond2")),
-                        safe_val(row.get("cond3")),
-                        safe_val(row.get("cond4")),
-                        safe_val(row.get("is_sanxian")),
-                    ])
+                sanxian_rows = self._verification_rows(sanxian_data, _US_VERIFY_SANXIAN_COLS)
 
                 worksheet.update(sanxian_rows, f"A{current_row}")
 
@@ -41,18 +41,26 @@ CREATE TABLE IF NOT EXISTS filter_result (
     stock_id VARCHAR(10) NOT NULL,
     stock_name VARCHAR(50) NOT NULL,
     industry_category VARCHAR(50),
-    return_20d DECIMAL(8, 4),
+    return_20d DOUBLE PRECISION,
     is_strong_list BOOLEAN,
     is_new_high_list BOOLEAN,
-    today_price DECIMAL(12, 4),
-    second_high_55d DECIMAL(12, 4),
-    gap_ratio DECIMAL(8, 4),
+    today_price DOUBLE PRECISION,
+    second_high_55d DOUBLE PRECISION,
+    gap_ratio DOUBLE PRECISION,
     created_at TIMESTAMP DEFAULT NOW()
 );
 
+CREATE TABLE IF NOT EXISTS export_meta (
+    sheet_id VARCHAR(100) NOT NULL,
+    tab VARCHAR(50) NOT NULL,
+    hash VARCHAR(64) NOT NULL,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (sheet_id, tab)
+);
+
 -- 索引優化
 CREATE INDEX IF NOT EXISTS idx_daily_price_stock_date ON daily_price(stock_id, date DESC);
-CREATE INDEX IF NOT EXISTS idx_daily_price_date ON daily_price(date);
+CREATE INDEX IF NOT EXISTS idx_daily_price_date_stock ON daily_price(date, stock_id);
 CREATE INDEX IF NOT EXISTS idx_market_index_date ON market_index(date DESC);
 CREATE INDEX IF NOT EXISTS idx_filter_result_date_type ON filter_result(filter_date, filter_type);
 
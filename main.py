@@ -48,11 +48,11 @@ PROJECT_ROOT = Path(__file__).resolve().parent
 sys.path.insert(0, str(PROJECT_ROOT))
 
 from config.settings import LOG_CONFIG, SCHEDULE_CONFIG
-from api.hybrid_client import HybridClient
-from data.sqlite_database import SQLiteDatabase
-from exporters.google_sheet import GoogleSheetExporter
+from api.hybrid_client import get_client
+from data.sqlite_database import get_db
+from exporters.google_sheet import get_exporter
 from tasks.daily_task import DailyTask, run_daily_task
-from tasks.monthly_task import MonthlyTask, run_monthly_task
+from tasks.monthly_task import MonthlyTask
 
 
 def setup_logging():
@@ -81,8 +81,8 @@ def cmd_init():
     logger.info("=== 初始化系統 ===")
 
     # 初始化元件
-    db = SQLiteDatabase()
-    client = HybridClient()
+    db = get_db()
+    client = get_client()
 
     # 建立資料表
     logger.info("建立資料表...")
@@ -135,7 +135,8 @@ def cmd_daily(target_date: date = None, skip_non_trading_day: bool = True):
     """執行每日任務"""
     from tasks.daily_task import DailyTask
 
-    task = DailyTask()
+    db = get_db()
+    task = DailyTask(client=get_client(), db=db, exporter=get_exporter(db))
     result = task.run(target_date, skip_non_trading_day=skip_non_trading_day)
 
     if result.get("skipped"):
@@ -150,7 +151,7 @@ def cmd_daily(target_date: date = None, skip_non_trading_day: bool = True):
 
 def cmd_monthly():
     """執行每月任務"""
-    result = run_monthly_task()
+    result = MonthlyTask(client=get_client(), db=get_db(), exporter=get_exporter()).run()
 
     if result["success"]:
         logger.info(f"每月任務成功: 更新 {result['stock_count']} 檔股票")
@@ -191,8 +192,13 @@ def cmd_schedule():
     logger.info("排程已啟動，等待執行...")
     while True:
         try:
+            # 睡到下一個排程時間（取代每 60 秒輪詢）；逾時立即執行，異常值退回 60 秒
+            idle = schedule.idle_seconds()
+            if idle is None:
+                logger.warning("無任何排程，排程停止")
+                break
+            time.sleep(max(idle, 0) if idle <= 86400 else 60)
             schedule.run_pending()
-            time.sleep(60)
         except KeyboardInterrupt:
             logger.info("收到中斷信號，排程停止")
             break
@@ -206,20 +212,20 @@ def cmd_health():
     logger.info("=== 健康檢查 ===")
 
     # 資料庫檢查
-    db = SQLiteDatabase()
+    db = get_db()
     db_ok = db.health_check()
     logger.info(f"SQLite 資料庫: {'✓ 正常' if db_ok else '✗ 異常'}")
     if db_ok:
         logger.info(f"  - 檔案大小: {db.get_db_size()}")
 
     # Google Sheet 檢查
-    exporter = GoogleSheetExporter()
+    exporter = get_exporter()
     sheet_ok = exporter.health_check()
     logger.info(f"Google Sheet: {'✓ 正常' if sheet_ok else '✗ 未連線'}")
 
     # API 檢查（HybridClient）
     try:
-        client = HybridClient()
+        client = get_client()
         # 嘗試取得少量資料
         df = client.get_stock_info()
         api_ok = not df.empty
@@ -245,8 +251,8 @@ def cmd_backfill(days: int = 30):
     """
     logger.info(f"=== 補齊 {days} 天歷史資料 ===")
 
-    db = SQLiteDatabase()
-    client = HybridClient()
+    db = get_db()
+    client = get_client()
 
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
@@ -2,10 +2,16 @@
 匯出單一股票的完整資料到驗證 Google Sheet
 
 用途：詳細對照資料庫計算結果（匯出全部歷史資料）
+
+可一次指定多檔股票：指標計算以行程池平行執行（各行程持有唯讀 SQLite 連線），
+上傳則以執行緒池共用同一個已授權的 Google Sheets 連線
+（建立分頁逐一進行，寫入資料並行）。
 """
+import os
 import sqlite3
 import sys
-from datetime import date
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
 
 import numpy as np
 import pandas as pd
@@ -15,38 +21,85 @@ from calculators.moving_average import MovingAverageCalculator
 from config.settings import SQLITE_DB_PATH, SHEET_IDS, GOOGLE_CREDENTIALS_PATH
 from exporters.google_sheet import GoogleSheetExporter
 
+# daily_price 查詢欄位（stock_id, date 之後皆為數值欄位）
+PRICE_COLUMNS = [
+    "stock_id", "date", "open_price", "high_price", "low_price", "close_price", "volume",
+]
+
+# 匯出欄位（標題列）
+HEADERS = [
+    "stock_id", "date",
+    "open_price", "high_price", "low_price", "close_price", "volume",
+    "ma8", "ma21", "ma50", "ma55", "ma150", "ma200",
+    "ma200_slope_20d", "return_20d",
+    "high_5d", "high_252d", "high_55d", "second_high_55d"
+]
+
+# 數值欄位小數位數（價格 2 位、指標 4 位）
+DECIMALS = {
+    "open_price": 2, "high_price": 2, "low_price": 2, "close_price": 2,
+    "ma8": 4, "ma21": 4, "ma50": 4, "ma55": 4, "ma150": 4, "ma200": 4,
+    "ma200_slope_20d": 4, "return_20d": 4,
+    "high_5d": 2, "high_252d": 2, "high_55d": 2, "second_high_55d": 2,
+}
+
+# 平行設定（計算為 CPU 密集、上傳為網路 I/O）
+COMPUTE_WORKERS = min(os.cpu_count() or 1, 8)
+UPLOAD_WORKERS = 4
+
+PRICE_QUERY = """
+    SELECT stock_id, date, open_price, high_price, low_price, close_price, volume
+    FROM daily_price
+    WHERE stock_id = ?
+    ORDER BY date
+"""
+
+# 工作行程的唯讀連線（由 _init_worker 建立）
+_worker_conn: Optional[sqlite3.Connection] = None
+
+
+def _open_readonly() -> sqlite3.Connection:
+    """開啟唯讀 SQLite 連線（mmap 讀取）"""
+    conn = sqlite3.connect(f"file:{SQLITE_DB_PATH}?mode=ro", uri=True)
+    conn.execute("PRAGMA mmap_size=268435456")
+    conn.execute("PRAGMA cache_size=-64000")
+    conn.execute("PRAGMA temp_store=MEMORY")
+    return conn
+
+
+def _init_worker():
+    """行程池初始化：每個工作行程建立一條唯讀連線"""
+    global _worker_conn
+    _worker_conn = _open_readonly()
+
 
-def export_single_stock(stock_id: str):
+def compute_rows(stock_id: str) -> list[list]:
     """
-    匯出單一股票的完整資料
+    讀取單一股票歷史資料並計算指標（CPU 密集，可於工作行程執行）
 
     Args:
         stock_id: 股票代號
-    """
-    logger.info(f"=== 開始匯出股票 {stock_id} 的完整資料 ===")
-
-    # 連接資料庫
-    conn = sqlite3.connect(SQLITE_DB_PATH)
 
-    # 讀取該股票的所有歷史資料
-    query = """
-        SELECT stock_id, date, open_price, high_price, low_price, close_price, volume
-        FROM daily_price
-        WHERE stock_id = ?
-        ORDER BY date
+    Returns:
+        資料列（不含標題列）；查無資料時為空列表
     """
-    df = pd.read_sql_query(query, conn, params=(stock_id,))
-    conn.close()
+    # 工作行程使用初始化時建立的連線，單獨呼叫時臨時開啟
+    conn = _worker_conn or _open_readonly()
+    try:
+        records = conn.execute(PRICE_QUERY, (stock_id,)).fetchall()
+    finally:
+        if conn is not _worker_conn:
+            conn.close()
+
+    df = pd.DataFrame.from_records(records, columns=PRICE_COLUMNS)
+    # 數值欄位轉為連續的 float64 陣列，供後續均線滾動計算使用
+    df[PRICE_COLUMNS[2:]] = df[PRICE_COLUMNS[2:]].astype("float64")
 
     if df.empty:
         logger.error(f"找不到股票 {stock_id} 的資料")
-        return False
-
-    logger.info(f"讀取 {len(df)} 筆歷史資料")
-    logger.info(f"日期範圍: {df['date'].min()} ~ {df['date'].max()}")
+        return []
 
-    # 計算所有均線和指標
-    logger.info("計算技術指標...")
+    logger.info(f"{stock_id}: 讀取 {len(df)} 筆歷史資料 ({df['date'].min()} ~ {df['date'].max()})")
 
     # VCP 相關均線
     df = MovingAverageCalculator.calculate_sma(df, [50, 150, 200])
@@ -59,107 +112,119 @@ def export_single_stock(stock_id: str):
     df = MovingAverageCalculator.calculate_close_high(df, periods=[55])
     df = MovingAverageCalculator.calculate_second_high(df, period=55)
 
-    # 準備匯出資料（全部歷史資料）
-    df_export = df.copy()
-
-    # 格式化數值
-    def safe_round(val, decimals=4):
-        """安全格式化數值"""
-        if pd.isna(val) or (isinstance(val, float) and np.isinf(val)):
-            return ""
-        if isinstance(val, (int, float)):
-            return round(val, decimals)
-        return val
-
-    # 準備標題列
-    headers = [
-        "stock_id", "date",
-        "open_price", "high_price", "low_price", "close_price", "volume",
-        "ma8", "ma21", "ma50", "ma55", "ma150", "ma200",
-        "ma200_slope_20d", "return_20d",
-        "high_5d", "high_252d", "high_55d", "second_high_55d"
-    ]
-
-    # 準備資料列
-    rows = []
-    for _, row in df_export.iterrows():
-        rows.append([
-            row.get("stock_id", ""),
-            str(row.get("date", "")),
-            safe_round(row.get("open_price"), 2),
-            safe_round(row.get("high_price"), 2),
-            safe_round(row.get("low_price"), 2),
-            safe_round(row.get("close_price"), 2),
-            int(row.get("volume", 0)) if pd.notna(row.get("volume")) else "",
-            safe_round(row.get("ma8"), 4),
-            safe_round(row.get("ma21"), 4),
-            safe_round(row.get("ma50"), 4),
-            safe_round(row.get("ma55"), 4),
-            safe_round(row.get("ma150"), 4),
-            safe_round(row.get("ma200"), 4),
-            safe_round(row.get("ma200_slope_20d"), 4),
-            safe_round(row.get("return_20d"), 4),
-            safe_round(row.get("high_5d"), 2),
-            safe_round(row.get("high_252d"), 2),
-            safe_round(row.get("high_55d"), 2),
-            safe_round(row.get("second_high_55d"), 2),
-        ])
-
-    # 匯出到 Google Sheet
-    logger.info("匯出到 Google Sheet...")
+    # 準備資料列（整欄格式化，NaN/inf 留空）
+    out = df.reindex(columns=HEADERS)
+    out["date"] = out["date"].astype(str)
 
+    # 讀取時已轉為 float，指標欄位亦為 float，直接整塊四捨五入並以 NaN 遮罩 inf
+    num = out[list(DECIMALS)].astype(float).round(DECIMALS)
+    num = num.mask(~np.isfinite(num))
+    out[list(DECIMALS)] = num.astype(object).where(num.notna(), "")
+
+    volume = out["volume"].astype("Int64")
+    out["volume"] = volume.astype(object).where(volume.notna(), "")
+
+    return out.to_numpy().tolist()
+
+
+def _connect_exporter() -> Optional[GoogleSheetExporter]:
+    """建立匯出器並確認連線"""
+    exporter = GoogleSheetExporter(GOOGLE_CREDENTIALS_PATH)
+    if not exporter.health_check():
+        logger.error("無法連線到 Google Sheets")
+        return None
+    return exporter
+
+
+def upload_rows(stock_id: str, rows: list[list], exporter: GoogleSheetExporter) -> bool:
+    """
+    上傳單一股票的資料列到驗證 Sheet（網路 I/O，可於執行緒執行）
+
+    Args:
+        stock_id: 股票代號
+        rows: compute_rows 產生的資料列
+        exporter: 共用的匯出器
+
+    Returns:
+        是否成功
+    """
     sheet_id = SHEET_IDS.get("verification")
     if not sheet_id:
         logger.error("未設定 SHEET_ID_VERIFICATION")
         return False
 
-    exporter = GoogleSheetExporter(GOOGLE_CREDENTIALS_PATH)
-    if not exporter.health_check():
-        logger.error("無法連線到 Google Sheets")
+    # 使用股票代號作為分頁名稱，插入在最前面
+    tab_name = f"Stock_{stock_id}"
+
+    if not exporter.replace_tab_values(sheet_id, tab_name, [HEADERS] + rows, index=0):
+        return False
+
+    logger.info(f"✅ 匯出完成: {len(rows)} 筆資料 -> {tab_name}")
+    return True
+
+
+def export_single_stock(stock_id: str, exporter: Optional[GoogleSheetExporter] = None):
+    """
+    匯出單一股票的完整資料
+
+    Args:
+        stock_id: 股票代號
+        exporter: 共用的匯出器（可選）
+    """
+    logger.info(f"=== 開始匯出股票 {stock_id} 的完整資料 ===")
+
+    rows = compute_rows(stock_id)
+    if not rows:
         return False
 
-    sheet = exporter._get_sheet(sheet_id)
-    if not sheet:
+    exporter = exporter or _connect_exporter()
+    if not exporter:
         return False
 
-    # 使用股票代號作為分頁名稱
-    tab_name = f"Stock_{stock_id}"
+    return upload_rows(stock_id, rows, exporter)
 
-    try:
-        # 如果分頁已存在，先刪除
-        try:
-            existing = sheet.worksheet(tab_name)
-            sheet.del_worksheet(existing)
-            logger.info(f"已刪除舊分頁: {tab_name}")
-        except Exception:
-            pass
-
-        # 建立新分頁
-        worksheet = sheet.add_worksheet(
-            title=tab_name,
-            rows=len(rows) + 10,
-            cols=len(headers) + 5,
-            index=0  # 插入在最前面
-        )
-
-        # 寫入標題和資料
-        all_data = [headers] + rows
-        worksheet.update(all_data, "A1")
-
-        logger.info(f"✅ 匯出完成: {len(rows)} 筆資料 -> {tab_name}")
-        return True
-
-    except Exception as e:
-        logger.error(f"匯出失敗: {e}")
+
+def main(*stock_ids: str) -> bool:
+    """
+    批次匯出多檔股票
+
+    指標計算交給行程池，每檔算完即送入上傳執行緒池，計算與上傳重疊進行。
+
+    Args:
+        stock_ids: 股票代號
+
+    Returns:
+        是否全部成功
+    """
+    if len(stock_ids) == 1:
+        return export_single_stock(stock_ids[0])
+
+    exporter = _connect_exporter()
+    if not exporter:
         return False
 
+    logger.info(f"=== 開始匯出 {len(stock_ids)} 檔股票 ===")
+
+    with ProcessPoolExecutor(
+        max_workers=min(COMPUTE_WORKERS, len(stock_ids)),
+        initializer=_init_worker,
+    ) as compute_pool, ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as upload_pool:
+        uploads = []
+        for stock_id, rows in zip(stock_ids, compute_pool.map(compute_rows, stock_ids)):
+            if rows:
+                uploads.append(upload_pool.submit(upload_rows, stock_id, rows, exporter))
+        results = [f.result() for f in uploads]
+
+    success = sum(results)
+    logger.info(f"=== 匯出結束: 成功 {success}/{len(stock_ids)} 檔 ===")
+    return success == len(stock_ids)
+
 
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("用法: python scripts/export_single_stock.py <stock_id>")
-        print("範例: python scripts/export_single_stock.py 1101")
+        print("用法: python scripts/export_single_stock.py <stock_id> [<stock_id> ...]")
+        print("範例: python scripts/export_single_stock.py 1101 2330")
         sys.exit(1)
 
-    stock_id = sys.argv[1]
-    success = export_single_stock(stock_id)
+    success = main(*sys.argv[1:])
     sys.exit(0 if success else 1)
@@ -1,8 +1,9 @@
 """
 用 FinMind 重新抓取股價資料並更新 SQLite 資料庫
 """
+import os
 import sqlite3
-import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import date, timedelta
 
 import pandas as pd
@@ -10,6 +11,25 @@ from loguru import logger
 
 from api.finmind_client import FinMindClient
 
+# daily_price 寫入欄位（依資料庫結構順序）
+PRICE_COLUMNS = ["stock_id", "date", "open_price", "high_price", "low_price", "close_price", "volume"]
+
+# 暫存表：各批次抓到即寫入獨立的暫存資料庫檔，最後在 SQL 內去重後搬入 daily_price
+STAGING_TABLE = "daily_price_staging"
+STAGING_SCHEMA = "staging"
+
+
+def _normalize_prices(df: pd.DataFrame) -> pd.DataFrame:
+    """FinMind 股價欄位轉為 daily_price 結構（欄位名稱、順序、日期格式）"""
+    df = df.rename(columns={
+        "open": "open_price",
+        "high": "high_price",
+        "low": "low_price",
+        "close": "close_price",
+    }).reindex(columns=PRICE_COLUMNS)
+    df["date"] = pd.to_datetime(df["date"]).dt.strftime("%Y-%m-%d")
+    return df
+
 
 def rebuild_price_data():
     """重建股價資料"""
@@ -19,7 +39,9 @@ def rebuild_price_data():
     START_DATE = date(2025, 1, 21)
     END_DATE = date(2026, 1, 21)
     BATCH_DAYS = 30  # 每批次抓取天數
-    BATCH_INTERVAL = 3  # 批次間隔秒數
+    FETCH_WORKERS = 4  # 並行抓取數（呼叫間隔由 FinMindClient 的 RateLimiter 控制）
+    # SQLite 預設單一語句最多 999 個綁定參數，多列 INSERT 每批列數 = 999 // 欄位數
+    SQLITE_MAX_VARIABLES = 999
 
     logger.info("=== 開始重建股價資料 ===")
     logger.info(f"日期範圍: {START_DATE} ~ {END_DATE}")
@@ -28,91 +50,97 @@ def rebuild_price_data():
     # 初始化 FinMind 客戶端
     client = FinMindClient()
 
-    # 連接資料庫
+    # 正式資料庫維持 WAL + NORMAL 同步，避免斷電損毀
     conn = sqlite3.connect(DB_PATH)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA temp_store=MEMORY")
     cursor = conn.cursor()
 
-    # 清空現有股價資料
-    logger.info("清空現有股價資料...")
-    cursor.execute("DELETE FROM daily_price")
-    conn.commit()
-    logger.info("已清空 daily_price 表")
+    # 暫存資料另存於獨立檔案，日誌放記憶體並關閉同步以加速（中斷時重新執行即可），
+    # 不影響正式資料庫的耐久性設定
+    staging_path = f"{DB_PATH}.staging"
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+    staging_conn = sqlite3.connect(staging_path)
+    staging_conn.execute("PRAGMA journal_mode=MEMORY")
+    staging_conn.execute("PRAGMA synchronous=OFF")
+
+    # 多列 INSERT 每批列數（不超過綁定參數上限）
+    chunksize = SQLITE_MAX_VARIABLES // len(PRICE_COLUMNS)
+
+    with staging_conn:
+        staging_conn.execute(f"""
+            CREATE TABLE {STAGING_TABLE} (
+                stock_id TEXT, date TEXT,
+                open_price REAL, high_price REAL, low_price REAL, close_price REAL,
+                volume INTEGER
+            )
+        """)
 
-    # 分批抓取資料
-    all_data = []
+    # 預先切出各批次日期區間
+    windows = []
     current_start = START_DATE
-    batch_num = 0
-    total_batches = ((END_DATE - START_DATE).days + BATCH_DAYS - 1) // BATCH_DAYS
-
     while current_start <= END_DATE:
-        batch_num += 1
         current_end = min(current_start + timedelta(days=BATCH_DAYS - 1), END_DATE)
-
-        logger.info(f"[{batch_num}/{total_batches}] 抓取 {current_start} ~ {current_end}...")
-
-        try:
-            df = client.get_stock_price(
-                start_date=current_start,
-                end_date=current_end,
-            )
-
-            if not df.empty:
-                all_data.append(df)
-                logger.info(f"  取得 {len(df)} 筆資料")
-            else:
-                logger.warning(f"  無資料")
-
-        except Exception as e:
-            logger.error(f"  抓取失敗: {e}")
-
-        # 下一批次
+        windows.append((current_start, current_end))
         current_start = current_end + timedelta(days=1)
-
-        # 批次間隔
-        if current_start <= END_DATE:
-            time.sleep(BATCH_INTERVAL)
-
-    # 合併所有資料
-    if not all_data:
+    total_batches = len(windows)
+
+    # 並行抓取（網路 I/O），RateLimiter 為執行緒安全，取代原本固定的批次間隔；
+    # 每批抓到即寫入暫存表，不在記憶體中累積全部資料
+    staged = 0
+    with ThreadPoolExecutor(max_workers=FETCH_WORKERS) as pool:
+        futures = {
+            pool.submit(client.get_stock_price, start_date=start, end_date=end): (start, end)
+            for start, end in windows
+        }
+        for batch_num, future in enumerate(as_completed(futures), 1):
+            # 取出即移除，寫入後批次 DataFrame 不再被引用
+            start, end = futures.pop(future)
+            try:
+                df = future.result()
+                if df.empty:
+                    logger.warning(f"[{batch_num}/{total_batches}] {start} ~ {end}: 無資料")
+                    continue
+                with staging_conn:
+                    _normalize_prices(df).to_sql(
+                        STAGING_TABLE, staging_conn, if_exists="append", index=False,
+                        method="multi", chunksize=chunksize,
+                    )
+                staged += len(df)
+                logger.info(f"[{batch_num}/{total_batches}] {start} ~ {end}: 取得 {len(df)} 筆資料")
+            except Exception as e:
+                logger.error(f"[{batch_num}/{total_batches}] {start} ~ {end}: 抓取失敗: {e}")
+
+    staging_conn.close()
+
+    if not staged:
         logger.error("無任何資料，結束")
+        os.remove(staging_path)
         conn.close()
         return
 
-    logger.info("合併資料...")
-    final_df = pd.concat(all_data, ignore_index=True)
-    logger.info(f"共 {len(final_df)} 筆資料")
-
-    # 去重
-    before_dedup = len(final_df)
-    final_df = final_df.drop_duplicates(subset=["stock_id", "date"], keep="last")
-    after_dedup = len(final_df)
-    if before_dedup != after_dedup:
-        logger.info(f"去重: {before_dedup} -> {after_dedup}")
-
-    # 寫入資料庫
-    logger.info("寫入資料庫...")
-
-    # 重新命名欄位以匹配資料庫結構
-    final_df = final_df.rename(columns={
-        "open": "open_price",
-        "high": "high_price",
-        "low": "low_price",
-        "close": "close_price",
-    })
-
-    # 確保欄位順序正確
-    columns = ["stock_id", "date", "open_price", "high_price", "low_price", "close_price", "volume"]
-
-    # 只保留需要的欄位
-    available_cols = [c for c in columns if c in final_df.columns]
-    final_df = final_df[available_cols]
-
-    # 轉換日期格式
-    final_df["date"] = pd.to_datetime(final_df["date"]).dt.strftime("%Y-%m-%d")
-
-    # 寫入
-    final_df.to_sql("daily_price", conn, if_exists="append", index=False)
-    conn.commit()
+    logger.info(f"共 {staged} 筆資料，寫入資料庫...")
+
+    # 清空舊資料 + 去重搬移（同一 stock_id/date 保留最後寫入者），合併為單一交易
+    columns = ", ".join(PRICE_COLUMNS)
+    staging_table = f"{STAGING_SCHEMA}.{STAGING_TABLE}"
+    conn.execute(f"ATTACH DATABASE ? AS {STAGING_SCHEMA}", (staging_path,))
+    try:
+        with conn:
+            conn.execute("DELETE FROM daily_price")
+            logger.info("已清空 daily_price 表")
+            conn.execute(f"""
+                INSERT INTO daily_price ({columns})
+                SELECT {columns} FROM {staging_table}
+                WHERE rowid IN (
+                    SELECT MAX(rowid) FROM {staging_table} GROUP BY stock_id, date
+                )
+            """)
+    finally:
+        conn.execute(f"DETACH DATABASE {STAGING_SCHEMA}")
+        os.remove(staging_path)
 
     # 驗證
     cursor.execute("SELECT COUNT(*) FROM daily_price")
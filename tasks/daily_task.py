@@ -8,11 +8,12 @@ from typing import Optional
 import pandas as pd
 from loguru import logger
 
-from api.hybrid_client import HybridClient
-from data.sqlite_database import SQLiteDatabase
+from api.hybrid_client import HybridClient, get_client
+from data.sqlite_database import SQLiteDatabase, get_db
 from calculators.vcp_filter import VCPFilter, calculate_market_return
 from calculators.sanxian_filter import SanxianFilter
-from exporters.google_sheet import GoogleSheetExporter
+from calculators.moving_average import MovingAverageCalculator
+from exporters.google_sheet import GoogleSheetExporter, get_exporter
 from utils.trading_calendar import TradingCalendar
 
 
@@ -45,7 +46,7 @@ class DailyTask:
         """
         self.client = client or HybridClient()
         self.db = db or SQLiteDatabase()
-        self.exporter = exporter or GoogleSheetExporter()
+        self.exporter = exporter or GoogleSheetExporter(db=self.db)
 
         # 篩選器
         self.vcp_filter = VCPFilter()
@@ -106,15 +107,15 @@ class DailyTask:
             self.db.create_tables()
 
             # Step 1: 確保有股票清單
-            stock_info = self.db.get_stock_info_dict()
-            if not stock_info:
+            stock_info = self.db.get_stock_info_df()
+            if stock_info.empty:
                 logger.info("股票清單為空，先取得股票清單...")
                 stock_df = self.client.get_stock_info()
                 if not stock_df.empty:
                     self.db.upsert_stock_info(stock_df)
-                    stock_info = self.db.get_stock_info_dict()
+                    stock_info = self.db.get_stock_info_df()
 
-            if not stock_info:
+            if stock_info.empty:
                 result["errors"].append("無法取得股票清單")
                 logger.error("無法取得股票清單，任務結束")
                 return result
@@ -134,12 +135,20 @@ class DailyTask:
                 logger.warning("無大盤指數資料，VCP 篩選可能不準確")
 
             # Step 4: 執行篩選
-            vcp_results, sanxian_results, market_return = self._run_filters(target_date)
+            (
+                vcp_results, sanxian_results, market_return,
+                vcp_verification, sanxian_verification,
+            ) = self._run_filters(target_date)
             result["vcp_count"] = len(vcp_results)
             result["sanxian_count"] = len(sanxian_results)
 
             # Step 5: 匯出至 Google Sheet（包含驗證資料）
-            self._export_to_sheet(target_date, vcp_results, sanxian_results, market_return)
+            self._export_to_sheet(
+                target_date, vcp_results, sanxian_results,
+                vcp_verification, sanxian_verification, market_return
+            )
+            # 驗證資料只在匯出時使用，匯出後立即釋放
+            del vcp_verification, sanxian_verification
 
             result["success"] = True
             logger.info(
@@ -151,20 +160,26 @@ class DailyTask:
             logger.error(f"每日任務失敗: {e}")
             result["errors"].append(str(e))
 
-        # SPEC: 將錯誤日誌寫入 Google Sheet「台股更新紀錄」
-        error_logs = self.client.get_error_log()
-        if error_logs and self.exporter.health_check():
-            self.exporter.log_error_to_sheet(error_logs)
+        finally:
+            # SPEC: 將錯誤日誌寫入 Google Sheet「台股更新紀錄」
+            # 提前結束（無股票清單、無股價）時也要寫入並清除，
+            # 避免共用的 client 把本次錯誤帶到下一次執行
+            try:
+                error_logs = self.client.get_error_log()
+                if error_logs and self.exporter.health_check():
+                    self.exporter.log_error_to_sheet(error_logs)
+            finally:
+                self.client.clear_logs()
 
         return result
 
-    def _fetch_and_save_prices(self, target_date: date, stock_info: dict) -> int:
+    def _fetch_and_save_prices(self, target_date: date, stock_info: pd.DataFrame) -> int:
         """取得並儲存股價（批量查詢）"""
         logger.info("取得當日股價...")
 
         # 取得所有股票代號和市場類型
-        stock_ids = list(stock_info.keys())
-        market_types = self.db.get_stock_market_types()
+        stock_ids = stock_info["stock_id"].tolist()
+        market_types = dict(zip(stock_info["stock_id"], stock_info["stock_type"]))
 
         # 使用 yfinance 批量查詢
         price_df = self.client.get_stock_price(
@@ -194,136 +209,143 @@ class DailyTask:
         count = self.db.upsert_market_index(market_df)
         return count
 
-    def _run_filters(self, target_date: date) -> tuple[list[dict], list[dict], float]:
+    def _run_filters(
+        self,
+        target_date: date
+    ) -> tuple[list[dict], list[dict], float, pd.DataFrame, pd.DataFrame]:
         """執行篩選
 
         Returns:
-            (vcp_results, sanxian_results, market_return_20d)
+            (vcp_results, sanxian_results, market_return_20d,
+             vcp_verification, sanxian_verification)
         """
         logger.info("執行篩選...")
 
-        # 取得計算所需的歷史資料（252 天）
+        # 取得計算所需的歷史資料（252 天），只取 stock_info 中的股票（SQL 端排除 ETF、權證等）
         start_date = target_date - timedelta(days=365)
-        price_df = self.db.get_daily_prices(start_date, target_date)
+        price_df = self.db.get_daily_prices(start_date, target_date, listed_only=True)
         market_df = self.db.get_market_index(start_date, target_date)
 
         if price_df.empty:
             logger.warning("無足夠歷史資料")
-            return [], [], 0.0
+            return [], [], 0.0, pd.DataFrame(), pd.DataFrame()
+
+        # 日期欄位只解析一次（篩選與驗證資料共用；cache 依唯一日期轉換）
+        price_df["date"] = pd.to_datetime(price_df["date"], cache=True)
 
         # 計算大盤報酬率
         market_return = calculate_market_return(market_df, target_date, lookback=20)
         logger.info(f"大盤 20 日報酬率: {market_return:.2%}")
 
-        # 取得股票基本資料
-        stock_info = self.db.get_stock_info_dict()
-        if not stock_info:
+        # 目標日期無任何股價時，篩選與驗證結果必為空，略過整段滾動計算
+        if not (price_df["date"] == pd.Timestamp(target_date)).any():
+            logger.warning(f"{target_date} 無股價資料，略過篩選")
+            return [], [], market_return, pd.DataFrame(), pd.DataFrame()
+
+        # 取得股票基本資料（VCP / 三線開花補充欄位共用）
+        info_df = self.db.get_stock_info_df()
+        if info_df.empty:
             logger.warning("股票基本資料為空，請先執行 'python main.py init'")
 
-        # 只保留 stock_info 中的股票（過濾掉 ETF、權證等）
-        valid_stock_ids = set(stock_info.keys())
-        before_filter = price_df["stock_id"].nunique()
-        price_df = price_df[price_df["stock_id"].isin(valid_stock_ids)]
-        after_filter = price_df["stock_id"].nunique()
-        logger.info(f"過濾股票: {before_filter} -> {after_filter} 檔（排除 ETF/權證）")
+        logger.info(f"讀取 {price_df['stock_id'].nunique()} 檔股票歷史資料（已排除 ETF/權證）")
+
+        # 兩種篩選與驗證共用的計算欄位（單次排序、分組計算所有滾動視窗）
+        prepared_df = MovingAverageCalculator.prepare_all_data(price_df)
+        del price_df
 
         # VCP 篩選
-        vcp_df = self.vcp_filter.filter(price_df, market_return, target_date)
-        vcp_results = self._enrich_results(vcp_df, stock_info)
+        vcp_df = self.vcp_filter.filter(prepared_df, market_return, target_date, prepared=True)
+        vcp_results = self._enrich_results(vcp_df, info_df)
 
         # 三線開花篩選
-        sanxian_df = self.sanxian_filter.filter(price_df, target_date)
-        sanxian_results = self._enrich_results(sanxian_df, stock_info)
+        sanxian_df = self.sanxian_filter.filter(prepared_df, target_date, prepared=True)
+        sanxian_results = self._enrich_results(sanxian_df, info_df)
 
         # 儲存篩選結果
-        self.db.save_filter_results(vcp_results, "vcp", target_date)
-        self.db.save_filter_results(sanxian_results, "sanxian", target_date)
+        self.db.save_filter_results_many(
+            {"vcp": vcp_results, "sanxian": sanxian_results}, target_date
+        )
 
         # 準備驗證資料
-        self._vcp_verification_data = self._prepare_vcp_verification(
-            price_df, market_return, target_date
+        vcp_verification = self._prepare_vcp_verification(
+            prepared_df, market_return, target_date
         )
-        self._sanxian_verification_data = self._prepare_sanxian_verification(
-            price_df, target_date
+        sanxian_verification = self._prepare_sanxian_verification(
+            prepared_df, target_date
         )
 
-        return vcp_results, sanxian_results, market_return
+        return vcp_results, sanxian_results, market_return, vcp_verification, sanxian_verification
 
     def _enrich_results(
         self,
-        df,
-        stock_info: dict[str, dict]
+        df: pd.DataFrame,
+        info_df: pd.DataFrame
     ) -> list[dict]:
-        """補充股票基本資料"""
+        """補充股票基本資料（以 stock_id 整表 merge）"""
         if df.empty:
             return []
 
-        def _safe_str(val, default="-"):
-            """將 NaN/None 轉為預設字串"""
-            if val is None or (isinstance(val, float) and pd.isna(val)):
-                return default
-            return str(val)
-
-        results = []
-        for _, row in df.iterrows():
-            stock_id = row["stock_id"]
-            info = stock_info.get(stock_id, {})
-
-            result = row.to_dict()
-            # 清理 row.to_dict() 中的 NaN 值（pandas 將 NULL 轉為 float NaN）
-            result = {k: (v if not (isinstance(v, float) and pd.isna(v)) else None)
-                      for k, v in result.items()}
-            result.update({
-                "stock_name": _safe_str(info.get("stock_name"), ""),
-                "company_name": _safe_str(info.get("stock_name"), ""),
-                "industry_category": _safe_str(info.get("industry_category")),
-                "industry_category2": _safe_str(info.get("industry_category2")),
-                "product_mix": "-",
-            })
-            results.append(result)
-
-        return results
+        info_cols = ["stock_name", "company_name", "industry_category",
+                     "industry_category2", "product_mix"]
+        merged = df.drop(columns=info_cols, errors="ignore").merge(
+            info_df[["stock_id", "stock_name", "industry_category", "industry_category2"]],
+            on="stock_id", how="left", validate="m:1"
+        )
+
+        # 文字欄位整欄補預設值並轉為字串（取代逐列 _safe_str）
+        cat_cols = ["industry_category", "industry_category2"]
+        merged["stock_name"] = merged["stock_name"].fillna("").astype(str)
+        merged["company_name"] = merged["stock_name"]
+        merged[cat_cols] = merged[cat_cols].fillna("-").astype(str)
+        merged["product_mix"] = "-"
+
+        # pandas 將 NULL 轉為 NaN，輸出前統一轉回 None
+        merged = merged.astype(object).where(merged.notna(), None)
+        return merged.to_dict("records")
+
+    @staticmethod
+    def _rows_on_date(df: pd.DataFrame, target_date: date) -> pd.DataFrame:
+        """取出目標日期的資料列（以 datetime64 比對，只轉換選出列的日期）"""
+        dates = pd.to_datetime(df["date"])
+        mask = dates == pd.Timestamp(target_date)
+        return df.loc[mask].assign(date=dates[mask].dt.date)
 
     def _prepare_vcp_verification(
         self,
-        price_df: pd.DataFrame,
+        prepared_df: pd.DataFrame,
         market_return: float,
         target_date: date
-    ) -> list[dict]:
+    ) -> pd.DataFrame:
         """
         準備 VCP 驗證資料（包含所有計算欄位）
-        """
-        from calculators.moving_average import MovingAverageCalculator
-
-        if price_df.empty:
-            return []
 
-        # 準備計算資料
-        df = MovingAverageCalculator.prepare_vcp_data(price_df)
-        if df.empty:
-            return []
+        prepared_df 為 MovingAverageCalculator.prepare_all_data 的結果
+        """
+        if prepared_df.empty:
+            return pd.DataFrame()
 
         # 取得目標日期的資料
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        df = df[df["date"] == target_date].copy()
+        df = self._rows_on_date(prepared_df, target_date)
 
         if df.empty:
-            return []
-
-        # 計算所有條件
-        close = df["close_price"].fillna(0)
-        ma50 = df["ma50"].fillna(float("inf"))
-        ma150 = df["ma150"].fillna(float("inf"))
-        ma200 = df["ma200"].fillna(float("inf"))
-
-        df["cond1"] = close > ma50
-        df["cond2"] = ma50 > ma150
-        df["cond3"] = ma150 > ma200
-        df["cond4"] = df["ma200_slope_20d"].fillna(-1) > 0
-        df["cond5"] = df["return_20d"].fillna(-float("inf")) > market_return
-
-        # 強勢清單
-        df["is_strong"] = df["cond1"] & df["cond2"] & df["cond3"] & df["cond4"] & df["cond5"]
+            return pd.DataFrame()
+
+        # 計算所有條件（空值一次補齊於副本，條件與強勢清單合併為單一 eval；
+        # 安裝 numexpr 時自動以單一 kernel 計算）
+        inf = float("inf")
+        filled = df[["close_price", "ma50", "ma150", "ma200", "ma200_slope_20d", "return_20d"]].fillna({
+            "close_price": 0, "ma50": inf, "ma150": inf, "ma200": inf,
+            "ma200_slope_20d": -1, "return_20d": -inf,
+        })
+        cond_cols = ["cond1", "cond2", "cond3", "cond4", "cond5", "is_strong"]
+        df[cond_cols] = filled.eval("""
+            cond1 = close_price > ma50
+            cond2 = ma50 > ma150
+            cond3 = ma150 > ma200
+            cond4 = ma200_slope_20d > 0
+            cond5 = return_20d > @market_return
+            is_strong = cond1 & cond2 & cond3 & cond4 & cond5
+        """)[cond_cols]
 
         # 新高清單
         high_5d = df["high_5d"].fillna(0)
@@ -334,59 +356,56 @@ class DailyTask:
         # VCP = 強勢 OR 新高
         df["is_vcp"] = df["is_strong"] | df["is_new_high"]
 
-        # 輸出所有股票的計算數據供驗證
-        return df.to_dict("records")
+        # 輸出所有股票的計算數據供驗證（直接交給匯出器，不轉為 dict 列表）
+        return df
 
     def _prepare_sanxian_verification(
         self,
-        price_df: pd.DataFrame,
+        prepared_df: pd.DataFrame,
         target_date: date
-    ) -> list[dict]:
+    ) -> pd.DataFrame:
         """
         準備三線開花驗證資料（包含所有計算欄位）
-        """
-        from calculators.moving_average import MovingAverageCalculator
 
-        if price_df.empty:
-            return []
-
-        # 準備計算資料
-        df = MovingAverageCalculator.prepare_sanxian_data(price_df)
-        if df.empty:
-            return []
+        prepared_df 為 MovingAverageCalculator.prepare_all_data 的結果
+        """
+        if prepared_df.empty:
+            return pd.DataFrame()
 
         # 取得目標日期的資料
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        df = df[df["date"] == target_date].copy()
+        df = self._rows_on_date(prepared_df, target_date)
 
         if df.empty:
-            return []
-
-        # 計算所有條件
-        close = df["close_price"].fillna(0)
-        ma8 = df["ma8"].fillna(float("inf"))
-        ma21 = df["ma21"].fillna(float("inf"))
-        ma55 = df["ma55"].fillna(float("inf"))
-
-        df["cond1"] = close > ma8
-        df["cond2"] = ma8 > ma21
-        df["cond3"] = ma21 > ma55
-        df["cond4"] = close >= df["high_55d"].fillna(float("inf"))
-
-        df["is_sanxian"] = df["cond1"] & df["cond2"] & df["cond3"] & df["cond4"]
+            return pd.DataFrame()
+
+        # 計算所有條件（空值一次補齊於副本，條件運算合併為單一 eval）
+        inf = float("inf")
+        filled = df[["close_price", "ma8", "ma21", "ma55", "high_55d"]].fillna({
+            "close_price": 0, "ma8": inf, "ma21": inf, "ma55": inf, "high_55d": inf,
+        })
+        cond_cols = ["cond1", "cond2", "cond3", "cond4", "is_sanxian"]
+        df[cond_cols] = filled.eval("""
+            cond1 = close_price > ma8
+            cond2 = ma8 > ma21
+            cond3 = ma21 > ma55
+            cond4 = close_price >= high_55d
+            is_sanxian = cond1 & cond2 & cond3 & cond4
+        """)[cond_cols]
 
         # 計算差距比例
         second_high = df["second_high_55d"].fillna(1).replace(0, 1)
-        df["gap_ratio"] = (close / second_high - 1)
+        df["gap_ratio"] = (filled["close_price"] / second_high - 1)
 
-        # 輸出所有股票的計算數據供驗證
-        return df.to_dict("records")
+        # 輸出所有股票的計算數據供驗證（直接交給匯出器，不轉為 dict 列表）
+        return df
 
     def _export_to_sheet(
         self,
         target_date: date,
         vcp_results: list[dict],
         sanxian_results: list[dict],
+        vcp_verification: pd.DataFrame,
+        sanxian_verification: pd.DataFrame,
         market_return: float = 0.0
     ):
         """匯出至 Google Sheet"""
@@ -394,30 +413,20 @@ class DailyTask:
             logger.warning("Google Sheet 未連線，跳過匯出")
             return
 
-        # 匯出 VCP
-        if vcp_results:
-            self.exporter.export_vcp(vcp_results, target_date)
-
-        # 匯出三線開花
-        if sanxian_results:
-            self.exporter.export_sanxian(sanxian_results, target_date)
-
-        # 匯出驗證資料
-        vcp_verification = getattr(self, "_vcp_verification_data", [])
-        sanxian_verification = getattr(self, "_sanxian_verification_data", [])
-
-        if vcp_verification or sanxian_verification:
-            self.exporter.export_verification(
-                vcp_verification,
-                sanxian_verification,
-                target_date,
-                market_return
-            )
+        # 並行匯出 VCP、三線開花、驗證資料（各自為獨立 Spreadsheet）
+        self.exporter.export_all(
+            vcp_results,
+            sanxian_results,
+            vcp_verification,
+            sanxian_verification,
+            target_date,
+            market_return
+        )
 
 
 def run_daily_task(target_date: Optional[date] = None) -> dict:
     """
-    執行每日任務的便捷函數
+    執行每日任務的便捷函數（使用共用的 API 客戶端、資料庫與匯出器）
 
     Args:
         target_date: 目標日期
@@ -425,5 +434,6 @@ def run_daily_task(target_date: Optional[date] = None) -> dict:
     Returns:
         執行結果
     """
-    task = DailyTask()
+    db = get_db()
+    task = DailyTask(client=get_client(), db=db, exporter=get_exporter(db))
     return task.run(target_date)
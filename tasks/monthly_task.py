@@ -79,6 +79,16 @@ class MonthlyTask:
             logger.error(f"每月任務失敗: {e}")
             result["errors"].append(str(e))
 
+        finally:
+            # 將錯誤日誌寫入 Google Sheet「台股更新紀錄」，
+            # 提前結束時也要清除，避免共用的 client 把本次錯誤帶到下一次執行
+            try:
+                error_logs = self.client.get_error_log()
+                if error_logs and self.exporter.health_check():
+                    self.exporter.log_error_to_sheet(error_logs)
+            finally:
+                self.client.clear_logs()
+
         return result
 
     def _export_to_sheet(self, stock_df):
@@ -87,29 +97,25 @@ class MonthlyTask:
             logger.warning("Google Sheet 未連線，跳過匯出")
             return
 
-        # 轉換為匯出格式（使用 to_dict 而非 iterrows 提升效能）
+        # 轉換為匯出格式（整欄補預設值後一次 to_dict，缺欄或空值填 "-"）
         # FinMind 提供多重產業分類（如 2330 台積電：半導體業、電子工業）
-        records = stock_df.to_dict("records")
-        data = [
-            {
-                "stock_id": row["stock_id"],
-                "stock_name": row["stock_name"],
-                "company_name": row["stock_name"],
-                "industry_category": row.get("industry_category", "-"),
-                "industry_category2": row.get("industry_category2", "-"),
-                "product_mix": "-",
-            }
-            for row in records
-        ]
-
-        # 匯出公司主檔
-        self.exporter.export_company_master(data)
-
-        # 更新紀錄（統一表格格式）
-        self.exporter.update_company_master_log(
-            note=f"公司主檔 {len(data)} 檔",
-            success=True
-        )
+        category_cols = ["industry_category", "industry_category2"]
+        df = stock_df.reindex(columns=["stock_id", "stock_name", *category_cols])
+        df[category_cols] = df[category_cols].fillna("-")
+        df.insert(2, "company_name", df["stock_name"])
+        df["product_mix"] = "-"
+        data = df.to_dict("records")
+
+        # 公司主檔與更新紀錄位於同一 Spreadsheet，合併為一次寫入
+        with self.exporter.batch_writes():
+            # 匯出公司主檔
+            self.exporter.export_company_master(data)
+
+            # 更新紀錄（統一表格格式）
+            self.exporter.update_company_master_log(
+                note=f"公司主檔 {len(data)} 檔",
+                success=True
+            )
 
 
 def run_monthly_task() -> dict:
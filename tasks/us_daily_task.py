@@ -232,6 +232,13 @@ class USDailyTask:
         market_return = calculate_us_market_return(market_df, target_date, lookback=20)
         logger.info(f"S&P 500 20 日報酬率: {market_return:.2%}")
 
+        # 目標日期無任何股價時，篩選與驗證結果必為空，略過整段滾動計算
+        if not (pd.to_datetime(price_df["date"]) == pd.Timestamp(target_date)).any():
+            logger.warning(f"{target_date} 無美股股價資料，略過篩選")
+            self._vcp_verification_data = []
+            self._sanxian_verification_data = []
+            return [], [], market_return
+
         # 取得股票基本資料
         stock_info = self.db.get_stock_info_dict()
         if not stock_info:
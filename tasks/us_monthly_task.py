@@ -134,21 +134,17 @@ class USMonthlyTask:
             logger.warning("美股 Google Sheet 未連線，跳過匯出")
             return
 
-        # 轉換為匯出格式
-        records = stock_df.to_dict("records")
-        data = [
-            {
-                "stock_id": row.get("stock_id", ""),
-                "stock_name": row.get("stock_name", ""),
-                "company_name": row.get("stock_name", ""),
-                "exchange": row.get("exchange", "-"),
-                "sector": row.get("sector", "-"),
-                "industry": row.get("industry", "-"),
-                "industry_category": row.get("sector", "-"),  # 相容欄位
-                "industry_category2": row.get("industry", "-"),
-            }
-            for row in records
-        ]
+        # 轉換為匯出格式（整欄補預設值後一次 to_dict）
+        name_cols = ["stock_id", "stock_name"]
+        info_cols = ["exchange", "sector", "industry"]
+        df = stock_df.reindex(columns=name_cols + info_cols)
+        df[name_cols] = df[name_cols].fillna("")
+        df[info_cols] = df[info_cols].fillna("-")
+        data = df.assign(
+            company_name=df["stock_name"],
+            industry_category=df["sector"],  # 相容欄位
+            industry_category2=df["industry"],
+        ).to_dict("records")
 
         # 匯出美股公司主檔
         self.exporter.export_company_master(data)
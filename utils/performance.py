@@ -1,6 +1,7 @@
 """
 效能監控工具
 """
+import threading
 import time
 from functools import wraps
 from typing import Callable, Any
@@ -17,8 +18,14 @@ class PerformanceMonitor:
     - 效能統計
     """
 
+    __slots__ = ("metrics", "_lock")
+
     def __init__(self):
-        self.metrics: dict[str, list[float]] = {}
+        # 各指標的累計統計 {count, total, min, max}（整數奈秒，統計時才換算為秒）
+        # 只保留累計值，長時間執行也不會無限累積樣本
+        self.metrics: dict[str, dict[str, int]] = {}
+        # 累計值的讀取-修改-寫入不是原子操作，多執行緒同時記錄時需加鎖
+        self._lock = threading.Lock()
 
     def timer(self, name: str) -> Callable:
         """
@@ -30,52 +37,77 @@ class PerformanceMonitor:
         Returns:
             裝飾器函數
         """
+        # 綁定為閉包區域變數，每次呼叫省去屬性查找
+        clock = time.perf_counter_ns
+        record = self._record
+        debug = logger.debug
+
         def decorator(func: Callable) -> Callable:
             @wraps(func)
             def wrapper(*args, **kwargs) -> Any:
-                start = time.time()
+                # 單調時鐘，不受系統校時影響
+                start = clock()
                 try:
                     result = func(*args, **kwargs)
                     return result
                 finally:
-                    elapsed = time.time() - start
-                    self._record(name, elapsed)
-                    logger.debug(f"{name}: {elapsed:.2f}s")
+                    elapsed_ns = clock() - start
+                    record(name, elapsed_ns)
+                    # 以參數傳入，DEBUG 未啟用時不做字串格式化
+                    debug("{}: {:.2f}s", name, elapsed_ns * 1e-9)
             return wrapper
         return decorator
 
-    def _record(self, name: str, elapsed: float):
-        """記錄指標"""
-        if name not in self.metrics:
-            self.metrics[name] = []
-        self.metrics[name].append(elapsed)
+    def _record(self, name: str, elapsed_ns: int):
+        """記錄指標（奈秒）"""
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                self.metrics[name] = {
+                    "count": 1, "total": elapsed_ns, "min": elapsed_ns, "max": elapsed_ns,
+                }
+                return
+
+            metric["count"] += 1
+            metric["total"] += elapsed_ns
+            if elapsed_ns < metric["min"]:
+                metric["min"] = elapsed_ns
+            if elapsed_ns > metric["max"]:
+                metric["max"] = elapsed_ns
 
     def get_stats(self, name: str) -> dict:
-        """取得指定指標的統計"""
-        if name not in self.metrics:
-            return {}
+        """取得指定指標的統計（單位：秒）"""
+        with self._lock:
+            if name not in self.metrics:
+                return {}
+            metric = dict(self.metrics[name])
 
-        values = self.metrics[name]
         return {
-            "count": len(values),
-            "total": sum(values),
-            "avg": sum(values) / len(values),
-            "min": min(values),
-            "max": max(values),
+            "count": metric["count"],
+            "total": metric["total"] * 1e-9,
+            "avg": metric["total"] / metric["count"] * 1e-9,
+            "min": metric["min"] * 1e-9,
+            "max": metric["max"] * 1e-9,
         }
 
     def get_all_stats(self) -> dict:
         """取得所有指標的統計"""
-        return {name: self.get_stats(name) for name in self.metrics}
+        return {name: self.get_stats(name) for name in self._names()}
 
     def clear(self):
         """清除所有指標"""
-        self.metrics.clear()
+        with self._lock:
+            self.metrics.clear()
+
+    def _names(self) -> list[str]:
+        """指標名稱快照（避免走訪期間其他執行緒新增指標）"""
+        with self._lock:
+            return list(self.metrics)
 
     def report(self) -> str:
         """產生效能報告"""
         lines = ["=== 效能報告 ==="]
-        for name, values in self.metrics.items():
+        for name in self._names():
             stats = self.get_stats(name)
             lines.append(
                 f"{name}: 次數={stats['count']}, "
@@ -1,11 +1,16 @@
 """
 台股交易日曆工具
 """
+import bisect
+import functools
 from datetime import date, timedelta
 from typing import Optional
 
 from loguru import logger
 
+# 逐日走訪時重複使用，避免每圈建立 timedelta
+_ONE_DAY = timedelta(days=1)
+
 
 class TradingCalendar:
     """
@@ -20,7 +25,7 @@ class TradingCalendar:
 
     # 2024-2026 台股國定假日（可根據需要擴充）
     # 資料來源：台灣證券交易所
-    HOLIDAYS = {
+    HOLIDAYS = frozenset({
         # 2024
         date(2024, 1, 1),   # 元旦
         date(2024, 2, 8),   # 除夕
@@ -74,15 +79,35 @@ class TradingCalendar:
         date(2026, 9, 25),  # 中秋節
         date(2026, 10, 9),  # 國慶日（彈性放假）
         date(2026, 10, 10), # 國慶日
-    }
+    })
 
     # 假日清單涵蓋的最後年份
     HOLIDAYS_LAST_YEAR = 2026
 
     @classmethod
+    @functools.lru_cache(maxsize=None)
+    def _trading_days(cls) -> tuple[date, ...]:
+        """假日清單涵蓋年份內的所有交易日（排序後的 tuple，首次使用時建立）"""
+        current = date(min(cls.HOLIDAYS).year, 1, 1)
+        last = date(cls.HOLIDAYS_LAST_YEAR, 12, 31)
+
+        days = []
+        while current <= last:
+            if current.weekday() < 5 and current not in cls.HOLIDAYS:
+                days.append(current)
+            current += _ONE_DAY
+        return tuple(days)
+
+    @classmethod
+    def _is_covered(cls, check_date: date) -> bool:
+        """日期是否落在假日清單涵蓋的年份內"""
+        return min(cls.HOLIDAYS).year <= check_date.year <= cls.HOLIDAYS_LAST_YEAR
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
     def is_trading_day(cls, check_date: date) -> bool:
         """
-        判斷是否為交易日
+        判斷是否為交易日（依日期快取，過期警告每個日期只記錄一次）
 
         Args:
             check_date: 要檢查的日期
@@ -123,14 +148,30 @@ class TradingCalendar:
         Returns:
             前一個交易日，找不到則回傳 None
         """
-        current = from_date - timedelta(days=1)
+        previous = cls._previous_trading_day(from_date, max_lookback)
+        if previous is None:
+            logger.warning(f"找不到 {from_date} 前 {max_lookback} 天內的交易日")
+        return previous
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def _previous_trading_day(cls, from_date: date, max_lookback: int) -> Optional[date]:
+        """get_previous_trading_day 的快取實作（找不到時的警告由呼叫端記錄）"""
+        # 涵蓋年份內以二分搜尋取前一個交易日
+        if cls._is_covered(from_date):
+            days = cls._trading_days()
+            index = bisect.bisect_left(days, from_date)
+            if index > 0 and (from_date - days[index - 1]).days <= max_lookback:
+                return days[index - 1]
+
+        current = from_date - _ONE_DAY
+        is_trading_day = cls.is_trading_day
 
         for _ in range(max_lookback):
-            if cls.is_trading_day(current):
+            if is_trading_day(current):
                 return current
-            current -= timedelta(days=1)
+            current -= _ONE_DAY
 
-        logger.warning(f"找不到 {from_date} 前 {max_lookback} 天內的交易日")
         return None
 
     @classmethod
@@ -154,17 +195,20 @@ class TradingCalendar:
         """
         from_date = from_date or date.today()
 
+        latest = cls._latest_trading_day(from_date, max_lookback)
+        if latest != from_date:
+            logger.info(f"{from_date} 非交易日，使用前一個交易日: {latest}")
+        return latest
+
+    @classmethod
+    @functools.lru_cache(maxsize=4096)
+    def _latest_trading_day(cls, from_date: date, max_lookback: int) -> date:
+        """get_latest_trading_day 的快取實作（鍵為已解析的日期，不受預設「今天」影響）"""
         if cls.is_trading_day(from_date):
             return from_date
 
-        previous = cls.get_previous_trading_day(from_date, max_lookback)
-
-        if previous:
-            logger.info(f"{from_date} 非交易日，使用前一個交易日: {previous}")
-            return previous
-
         # 找不到的話，回傳原日期（讓 API 去處理）
-        return from_date
+        return cls.get_previous_trading_day(from_date, max_lookback) or from_date
 
     @classmethod
     def is_weekend(cls, check_date: date) -> bool:
@@ -187,12 +231,20 @@ class TradingCalendar:
         Returns:
             交易日列表
         """
+        # 範圍完全落在涵蓋年份內時，直接切出預先建立的交易日
+        if cls._is_covered(start_date) and cls._is_covered(end_date):
+            days = cls._trading_days()
+            return list(days[
+                bisect.bisect_left(days, start_date):bisect.bisect_right(days, end_date)
+            ])
+
         trading_days = []
         current = start_date
+        is_trading_day = cls.is_trading_day
 
         while current <= end_date:
-            if cls.is_trading_day(current):
+            if is_trading_day(current):
                 trading_days.append(current)
-            current += timedelta(days=1)
+            current += _ONE_DAY
 
         return trading_days